@@ -1,7 +1,10 @@
-from flask import Flask, jsonify, request 
+from flask import Flask, Response, jsonify, request, redirect
 from flask_restx import Resource, Api, fields, reqparse, Namespace
 import traceback
+import hashlib
 import logging
+import json
+import os
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -30,6 +33,74 @@ ns = api.namespace('badges', description='Operações relacionadas a Badges')
 
 from . import business
 
+def json_response(result):
+    """Serializa o resultado das funções de negócio, preservando o status HTTP das tuplas (corpo, status)."""
+    if isinstance(result, tuple):
+        body, status_code = result
+        return body, status_code
+    return jsonify(result)
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Linhas acumuladas antes de cada envio nas respostas em streaming
+STREAM_FLUSH_ROWS = int(os.getenv("BADGE_STREAM_FLUSH_ROWS", "100"))
+# Limite de linhas por resposta em streaming: no Azure Functions o WsgiMiddleware junta o corpo inteiro em memória
+# antes de responder, então o streaming não limita o consumo de memória por si só
+STREAM_MAX_ROWS = int(os.getenv("BADGE_STREAM_MAX_ROWS", "50000"))
+
+def wants_ndjson():
+    # Opt-in: somente quando o cliente prefere NDJSON a JSON no cabeçalho Accept
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(result):
+    """
+    Transmite as linhas do gerador como NDJSON, em blocos de até STREAM_FLUSH_ROWS linhas e no máximo STREAM_MAX_ROWS
+    linhas; acima do limite a última linha é um erro indicando a paginação (page_size/continuation_token).
+    """
+    if isinstance(result, tuple):
+        body, status_code = result
+        return body, status_code
+
+    def generate():
+        buffer = []
+        try:
+            for count, row in enumerate(result):
+                if count >= STREAM_MAX_ROWS:
+                    logging.log(logging.WARNING, f"Resposta NDJSON truncada em {STREAM_MAX_ROWS} linhas.")
+                    buffer.append(json.dumps({"error": f"Resultado truncado em {STREAM_MAX_ROWS} linhas; use page_size e continuation_token"}, ensure_ascii=False))
+                    # Encerra o gerador para liberar o cursor do banco
+                    result.close()
+                    break
+                buffer.append(json.dumps(row, ensure_ascii=False, default=str))
+                if len(buffer) >= STREAM_FLUSH_ROWS:
+                    yield "\n".join(buffer) + "\n"
+                    buffer = []
+        except Exception:
+            # Os cabeçalhos já foram enviados: o erro é sinalizado como última linha
+            logging.exception("Erro ao transmitir resposta NDJSON:")
+            buffer.append(json.dumps({"error": "Erro interno no servidor"}))
+        if buffer:
+            yield "\n".join(buffer) + "\n"
+
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+def cacheable_response(result):
+    """
+    Serializa o resultado de uma leitura com ETag forte (hash do corpo) e Cache-Control.
+    Um If-None-Match igual ao ETag atual recebe 304 sem corpo. Erros seguem sem cache.
+    Só para rotas cujo resultado depende do corpo JSON da requisição: a URL não identifica a resposta.
+    """
+    if isinstance(result, tuple):
+        # O flask-restx serializa o corpo; um Response do jsonify dentro da tupla não é aceito
+        body, status_code = result
+        return body, status_code
+
+    response = jsonify(result)
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest())
+    # Sem cache compartilhado e sempre revalidado: o ETag é o hash do resultado, então um 304 só sai se o conteúdo for o mesmo
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
 hello_model = api.model('Hello', {
     'owner_name': fields.String(required=True, description='Nome do proprietário da requisição')
 })
@@ -83,6 +154,20 @@ class Configs(Resource):
         result = business.get_configs()
         return jsonify(result)
 
+@ns.route('/stats')
+class Stats(Resource):
+    @ns.doc(
+        description="Retorna estatísticas de runtime (pools de conexão e caches) para dimensionamento.",
+        responses={
+            200: "Retorno ok",
+            500: "Erro interno da aplicação"
+        }
+    )
+    def get(self):
+        """Endpoint para recuperar estatísticas de runtime da API."""
+        result = business.get_stats()
+        return jsonify(result)
+
 # TODO: #74 Payload compactado
 
 
@@ -107,7 +192,37 @@ class EmitBadge(Resource):
         logging.info(f"[app] Endpoint para emitir um novo badge.")
         data = request.json
         result = business.generate_badge(data)
-        return jsonify(result)
+        return json_response(result)
+
+
+badge_holder_item_model = ns.model('BadgeHolderItem', {
+    'owner_name': fields.String(required=True, description='Nome do proprietário do badge')
+})
+
+badges_model = ns.model('BadgesData', {
+    'issuer_name': fields.String(required=True, description='Nome do emissor dos badges'),
+    'area_name': fields.String(required=True, description='Área dos badges'),
+    'holders': fields.List(fields.Nested(badge_holder_item_model), required=True, description='Detentores dos badges')
+})
+
+@ns.route('/emit_badges')
+class EmitBadges(Resource):
+    @ns.doc(
+        description="Emitir badges em lote para um mesmo emissor e área, com resultado por item.",
+        responses={
+            200: "Todos os badges emitidos com sucesso",
+            207: "Emissão parcial: consulte o resultado de cada item",
+            400: "Erro de validação",
+            418: "Nenhum badge emitido"
+        }
+    )
+    @ns.expect(badges_model, validate=True)
+    def post(self):
+        """Endpoint para emitir badges em lote."""
+        logging.info(f"[app] Endpoint para emitir badges em lote.")
+        data = request.json
+        result = business.generate_badges(data)
+        return json_response(result)
 
       
 badge_image_model = ns.model('BadgeImageRequest', {
@@ -120,6 +235,7 @@ class GetBadgeImage(Resource):
         description="Obter a imagem de um badge específico via JSON.",
         responses={
             200: "Badge encontrado",
+            304: "Não modificado (If-None-Match corresponde ao ETag)",
             400: "Dados inválidos",
             404: "Badge não encontrado",
             418: "Erro interno da aplicação"
@@ -132,13 +248,36 @@ class GetBadgeImage(Resource):
             if request.data:
                 data = request.get_json(silent=True)
                 result = business.badge_image(data)
-                return jsonify(result)
+                return cacheable_response(result)
             else:
                 return jsonify({"error": "Nenhum dado enviado"}), 400
         except Exception as e:
             logging.exception("Erro ao processar a solicitação:")
             return jsonify({"error": "Erro interno no servidor"}), 500
 
+
+@ns.route('/image/<string:badge_guid>')
+class BadgeImageRedirect(Resource):
+    @ns.doc(
+        description="Redireciona para a imagem de um badge por meio de uma URL SAS de curta duração.",
+        responses={
+            302: "Redirecionamento para a imagem do badge",
+            400: "GUID inválido",
+            404: "Badge não encontrado",
+            500: "Erro interno da aplicação"
+        }
+    )
+    def get(self, badge_guid):
+        """Endpoint para redirecionar para a imagem de um badge específico."""
+        result = business.badge_image_redirect(badge_guid)
+        if isinstance(result, tuple):
+            body, status_code = result
+            return body, status_code
+
+        response = redirect(result["url"], code=302)
+        response.headers["Cache-Control"] = f"public, max-age={result['max_age']}"
+        return response
+
       
 validate_badge_model = ns.model('ValidateBadgeRequest', {
     'data': fields.String(required=True, description='Dados criptografados do badge')
@@ -150,6 +289,7 @@ class ValidateBadge(Resource):
         description="Validar a autenticidade de um badge.",
         responses={
             200: "Badge válido",
+            304: "Não modificado (If-None-Match corresponde ao ETag)",
             400: "Falha na descriptografia ou dados inválidos",
             404: "Badge não encontrado ou informações não correspondem",
             418: "Erro interno da aplicação"
@@ -163,7 +303,7 @@ class ValidateBadge(Resource):
             if request.data:
                 data = request.get_json(silent=True)
                 result = business.badge_valid(data)
-                return jsonify(result)
+                return cacheable_response(result)
             else:
                 return jsonify({"error": "Nenhum dado enviado"}), 400
         except Exception as e:
@@ -172,13 +312,15 @@ class ValidateBadge(Resource):
 
       
 user_badges_model = ns.model('UserBadgesRequest', {
-    'user_id': fields.String(required=True, description='ID do usuário para o qual os badges serão buscados')
+    'user_id': fields.String(required=True, description='ID do usuário para o qual os badges serão buscados'),
+    'page_size': fields.Integer(required=False, description='Quantidade de badges por página. Com page_size ou continuation_token a resposta é {badges, continuation_token}; sem eles, a lista completa'),
+    'continuation_token': fields.String(required=False, description='Token devolvido pela página anterior')
 })
 
 @ns.route('/get_user_badges')
 class GetUserBadges(Resource):
     @ns.doc(
-        description="Obter a lista de badges de um usuário específico via JSON.",
+        description="Obter a lista de badges de um usuário específico via JSON. Com Accept: application/x-ndjson a lista completa é transmitida em streaming, uma linha JSON por item.",
         responses={
             200: "Lista de badges retornada com sucesso",
             400: "Dados inválidos",
@@ -192,8 +334,10 @@ class GetUserBadges(Resource):
         try:
             if request.data:
                 data = request.get_json(silent=True)
+                if wants_ndjson():
+                    return ndjson_response(business.stream_badge_list(data))
                 result = business.badge_list(data)
-                return jsonify(result)
+                return json_response(result)
             else:
                 return jsonify({"error": "Nenhum dado enviado"}), 400
         except Exception as e:
@@ -202,13 +346,15 @@ class GetUserBadges(Resource):
 
       
 badge_holders_model = ns.model('BadgeHoldersRequest', {
-    'badge_name': fields.String(required=True, description='Nome do badge para buscar os detentores')
+    'badge_name': fields.String(required=True, description='Nome do badge para buscar os detentores'),
+    'page_size': fields.Integer(required=False, description='Quantidade de detentores por página. Com page_size ou continuation_token a resposta é {holders, continuation_token}; sem eles, a lista completa'),
+    'continuation_token': fields.String(required=False, description='Token devolvido pela página anterior')
 })
 
 @ns.route('/get_badge_holders')
 class GetBadgeHolders(Resource):
     @ns.doc(
-        description="Obter a lista de usuários que possuem um badge específico via JSON.",
+        description="Obter a lista de usuários que possuem um badge específico via JSON. Com Accept: application/x-ndjson a lista completa é transmitida em streaming, uma linha JSON por item.",
         responses={
             200: "Lista de detentores do badge retornada com sucesso",
             400: "Dados inválidos",
@@ -222,8 +368,10 @@ class GetBadgeHolders(Resource):
         try:
             if request.data:
                 data = request.get_json(silent=True)
+                if wants_ndjson():
+                    return ndjson_response(business.stream_badge_holder(data))
                 result = business.badge_holder(data)
-                return jsonify(result)
+                return json_response(result)
             else:
                 return jsonify({"error": "Nenhum dado enviado"}), 400
         except Exception as e:
@@ -241,6 +389,7 @@ class GetLinkedInPost(Resource):
         description="Gerar um texto sugerido para postagem no LinkedIn sobre um badge via JSON.",
         responses={
             200: "Postagem gerada com sucesso",
+            304: "Não modificado (If-None-Match corresponde ao ETag)",
             400: "Dados inválidos",
             404: "Badge não encontrado",
             418: "Erro interno da aplicação"
@@ -253,7 +402,7 @@ class GetLinkedInPost(Resource):
             if request.data:
                 data = request.get_json(silent=True)
                 result = business.linkedin_post(data)
-                return jsonify(result)
+                return cacheable_response(result)
             else:
                 return jsonify({"error": "Nenhum dado enviado"}), 400
         except Exception as e:
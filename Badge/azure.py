@@ -1,27 +1,364 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
+import time
 import traceback
+from azure.core.exceptions import ClientAuthenticationError, HttpResponseError, ResourceExistsError, ResourceNotFoundError
 from azure.identity import DefaultAzureCredential
 from azure.appconfiguration import AzureAppConfigurationClient
 from azure.mgmt.sql import SqlManagementClient
 from azure.keyvault.secrets import SecretClient
-from azure.storage.blob import BlobServiceClient, BlobClient, generate_blob_sas, BlobSasPermissions
-from datetime import datetime, timedelta
+from azure.storage.blob import BlobServiceClient, BlobClient, generate_blob_sas, generate_container_sas, BlobSasPermissions, ContainerSasPermissions
+from datetime import datetime, timedelta, timezone
+import urllib.parse
 import re
 from PIL import Image
 import io
 from pilmoji import Pilmoji
 import logging
 
+from .cache import AssetCache, LRUCache
+
+# Parâmetros do cache de configurações (podem ser sobrescritos por variáveis de ambiente)
+APP_CONFIG_LABEL = "Badge"
+APP_CONFIG_CACHE_TTL = int(os.getenv("BADGE_APPCONFIG_CACHE_TTL", "300"))
+APP_CONFIG_SENTINEL_KEY = os.getenv("BADGE_APPCONFIG_SENTINEL_KEY", "Sentinel")
+
+class AppConfigCache:
+    """
+    Cache em memória das configurações de um label do App Configuration.
+    Carrega todas as chaves do label em uma única chamada e, após o TTL, verifica em segundo plano
+    a chave sentinela; o label só é recarregado quando a sentinela muda (ou não existe).
+    """
+
+    def __init__(self, app_config_client, label=APP_CONFIG_LABEL, ttl=APP_CONFIG_CACHE_TTL, sentinel_key=APP_CONFIG_SENTINEL_KEY):
+        self.app_config_client = app_config_client
+        self.label = label
+        self.ttl = ttl
+        self.sentinel_key = sentinel_key
+        self._settings = None
+        self._sentinel_etag = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def load(self):
+        settings = {}
+        sentinel_etag = None
+        for setting in self.app_config_client.list_configuration_settings(label_filter=self.label):
+            settings[setting.key] = setting.value
+            if setting.key == self.sentinel_key:
+                sentinel_etag = setting.etag
+        with self._lock:
+            self._settings = settings
+            self._sentinel_etag = sentinel_etag
+            self._loaded_at = time.monotonic()
+        logging.log(logging.INFO, f"[azure] {len(settings)} configurações do label '{self.label}' carregadas em cache.")
+
+    def _sentinel_changed(self):
+        try:
+            sentinel = self.app_config_client.get_configuration_setting(self.sentinel_key, label=self.label)
+            return sentinel.etag != self._sentinel_etag
+        except Exception:
+            # Sem sentinela não há como detectar mudanças: recarrega o label inteiro
+            return True
 
+    def _refresh(self):
+        try:
+            if self._sentinel_changed():
+                self.load()
+            else:
+                with self._lock:
+                    self._loaded_at = time.monotonic()
+        except Exception as e:
+            logging.log(logging.WARNING, f"[azure] Falha ao atualizar cache de configurações, mantendo valores atuais: {str(e)}")
+        finally:
+            self._refreshing = False
+
+    def _schedule_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="AppConfigCacheRefresh", daemon=True).start()
+
+    def get(self, key):
+        """Retorna (encontrado, valor) a partir do cache, carregando o label na primeira chamada."""
+        if self._settings is None:
+            self.load()
+        elif time.monotonic() - self._loaded_at > self.ttl:
+            self._schedule_refresh()
+
+        settings = self._settings
+        if key in settings:
+            return True, settings[key]
+        return False, None
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = 0
+
+    def stats(self):
+        return {
+            "label": self.label,
+            "keys": len(self._settings or {}),
+            "ttl": self.ttl,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._settings is not None else None,
+        }
+
+# Parâmetros do cache de segredos (podem ser sobrescritos por variáveis de ambiente)
+SECRET_CACHE_TTL = int(os.getenv("BADGE_SECRET_CACHE_TTL", "900"))
+SECRET_CACHE_STALE_TTL = int(os.getenv("BADGE_SECRET_CACHE_STALE_TTL", "3600"))
+
+def is_auth_error(error):
+    """Indica se a exceção representa falha de autenticação/autorização (credencial possivelmente rotacionada)."""
+    if isinstance(error, ClientAuthenticationError):
+        return True
+    if isinstance(error, HttpResponseError) and error.status_code in (401, 403):
+        return True
+    # Códigos do MongoDB/CosmosDB: 13 = Unauthorized, 18 = AuthenticationFailed
+    return getattr(error, "code", None) in (13, 18)
+
+class SecretCache:
+    """
+    Cache de segredos do Key Vault compartilhado pelo processo, indexado por (vault, nome, versão).
+    Dentro do TTL o valor é servido da memória; entre o TTL e o TTL de obsolescência o valor antigo
+    é devolvido enquanto uma thread busca a versão atual (stale-while-revalidate).
+    """
+
+    def __init__(self, ttl=SECRET_CACHE_TTL, stale_ttl=SECRET_CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def _fetch(self, secret_client, key):
+        _, name, version = key
+        secret = secret_client.get_secret(name, version=version)
+        with self._lock:
+            self._entries[key] = (secret.value, time.monotonic())
+        return secret.value
+
+    def _refresh(self, secret_client, key):
+        try:
+            self._fetch(secret_client, key)
+        except Exception as e:
+            logging.log(logging.WARNING, f"[azure] Falha ao revalidar o segredo '{key[1]}', mantendo valor atual: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, secret_client, name, version=None):
+        key = (secret_client.vault_url, name, version)
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return value
+            if age < self.stale_ttl:
+                self.stale_hits += 1
+                with self._lock:
+                    schedule = key not in self._refreshing
+                    self._refreshing.add(key)
+                if schedule:
+                    threading.Thread(target=self._refresh, args=(secret_client, key), name="SecretCacheRefresh", daemon=True).start()
+                return value
+
+        self.misses += 1
+        return self._fetch(secret_client, key)
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[1] == name]:
+                    del self._entries[key]
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+        }
+
+secret_cache = SecretCache()
+
+# Parâmetros do pool HTTP para download de blobs (podem ser sobrescritos por variáveis de ambiente)
+HTTP_POOL_CONNECTIONS = int(os.getenv("BADGE_HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("BADGE_HTTP_POOL_MAXSIZE", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("BADGE_HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("BADGE_HTTP_READ_TIMEOUT", "15"))
+HTTP_MAX_RETRIES = int(os.getenv("BADGE_HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("BADGE_HTTP_BACKOFF_FACTOR", "0.3"))
+
+class HttpClient:
+    """
+    Sessão HTTP compartilhada (keep-alive) com pool de conexões por host, timeouts e retentativas com backoff.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.session = self._create_session()
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+
+    def _create_session(self):
+        retry = Retry(
+            total=HTTP_MAX_RETRIES,
+            backoff_factor=HTTP_BACKOFF_FACTOR,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"])
+        )
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+        start = time.perf_counter()
+        try:
+            return self.session.get(url, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.requests += 1
+                self.total_time += elapsed
+
+    def stats(self):
+        pools = []
+        adapter = self.session.get_adapter("https://")
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": pool.host,
+                "connections_created": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                "maxsize": HTTP_POOL_MAXSIZE,
+            })
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "avg_latency_ms": round(self.total_time / self.requests * 1000, 2) if self.requests else 0,
+                "pools": pools,
+            }
+
+http_client = HttpClient()
+asset_cache = AssetCache(http_client.get)
+
+# Parâmetros das URLs SAS (podem ser sobrescritos por variáveis de ambiente)
+SAS_USE_USER_DELEGATION = os.getenv("BADGE_SAS_USE_USER_DELEGATION", "false").lower() in ("1", "true", "yes")
+SAS_DELEGATION_KEY_TTL = int(os.getenv("BADGE_SAS_DELEGATION_KEY_TTL", str(6 * 24 * 3600)))
+SAS_DELEGATION_KEY_REFRESH_MARGIN = int(os.getenv("BADGE_SAS_DELEGATION_KEY_REFRESH_MARGIN", "3600"))
+# Tempo máximo de reuso de um token de contêiner; limita quanto tempo um token assinado com chave já rotacionada é servido
+SAS_TOKEN_CACHE_TTL = int(os.getenv("BADGE_SAS_TOKEN_CACHE_TTL", "600"))
+
+class SasTokenService:
+    """
+    Gera URLs SAS de leitura a partir de um token por contêiner e janela de expiração, reaproveitado para todos os blobs.
+    Com BADGE_SAS_USE_USER_DELEGATION os tokens são assinados com uma user delegation key (identidade do Azure AD),
+    obtida uma vez e reutilizada até perto do vencimento; caso contrário, com a chave da conta de armazenamento.
+    """
+
+    def __init__(self, azure_client, use_user_delegation=SAS_USE_USER_DELEGATION):
+        self.azure_client = azure_client
+        self.use_user_delegation = use_user_delegation
+        self._lock = threading.Lock()
+        self._delegation_key = None
+        self._delegation_key_expiry = None
+        self._tokens = LRUCache("sas_tokens", max_entries=256, ttl=SAS_TOKEN_CACHE_TTL)
+        self.delegation_key_fetches = 0
+
+    def _get_user_delegation_key(self):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            if self._delegation_key is None or now >= self._delegation_key_expiry - timedelta(seconds=SAS_DELEGATION_KEY_REFRESH_MARGIN):
+                blob_service_client = self.azure_client.blob_service_client
+                # A user delegation key só pode ser obtida com credencial do Azure AD (não com a chave da conta)
+                delegation_client = BlobServiceClient(blob_service_client.url, credential=self.azure_client.credential)
+                expiry = now + timedelta(seconds=SAS_DELEGATION_KEY_TTL)
+                self._delegation_key = delegation_client.get_user_delegation_key(now - timedelta(minutes=5), expiry)
+                self._delegation_key_expiry = expiry
+                self.delegation_key_fetches += 1
+                self._tokens.invalidate()
+            return self._delegation_key, self._delegation_key_expiry
+
+    def container_token(self, container_name, expiry):
+        blob_service_client = self.azure_client.blob_service_client
+        signing_kwargs = {}
+        if self.use_user_delegation:
+            delegation_key, delegation_key_expiry = self._get_user_delegation_key()
+            # O token não pode durar mais que a chave que o assina
+            expiry = min(expiry, delegation_key_expiry)
+            signing_kwargs["user_delegation_key"] = delegation_key
+        else:
+            signing_kwargs["account_key"] = blob_service_client.credential.account_key
+
+        def loader():
+            token = generate_container_sas(
+                blob_service_client.account_name,
+                container_name,
+                permission=ContainerSasPermissions(read=True),
+                expiry=expiry,
+                **signing_kwargs
+            )
+            return token, 1
+
+        return self._tokens.get_or_load((container_name, expiry), loader)
+
+    def invalidate(self):
+        # Chamado quando o cliente do storage é recriado: tokens e user delegation key podem ter sido assinados com credencial revogada
+        with self._lock:
+            self._delegation_key = None
+            self._delegation_key_expiry = None
+        self._tokens.invalidate()
+
+    def generate_urls(self, container_name, blob_names, expiry):
+        token = self.container_token(container_name, expiry)
+        container_url = self.azure_client.blob_service_client.get_container_client(container_name).url
+        return {blob_name: f"{container_url}/{urllib.parse.quote(blob_name)}?{token}" for blob_name in blob_names}
+
+    def stats(self):
+        return {
+            "user_delegation": self.use_user_delegation,
+            "delegation_key_fetches": self.delegation_key_fetches,
+            "delegation_key_expiry": self._delegation_key_expiry.isoformat() if self._delegation_key_expiry else None,
+            "tokens": self._tokens.stats(),
+        }
 
 # Classe principal
 class Azure:
     def __init__(self):
         self.credential = DefaultAzureCredential()
         self.app_config_client = self._initialize_app_config_client()
+        self.app_config_cache = AppConfigCache(self.app_config_client)
         self.secret_client = self._initialize_key_vault_client()
         self.blob_service_client = self._initialize_blob_service_client()
+        # Contêineres já verificados/criados neste processo (evita um exists() antes de cada upload)
+        self._known_containers = set()
+        self.sas_service = SasTokenService(self)
 
         # Atualizar a regra de firewall para Azure SQL
         #self.update_firewall_rule()
@@ -45,8 +382,14 @@ class Azure:
 
         return SecretClient(vault_url=key_vault_url, credential=self.credential)
     
-    def get_app_config_setting(self, key, label="Badge"):
+    def get_app_config_setting(self, key, label=APP_CONFIG_LABEL):
         try:
+            if label == self.app_config_cache.label:
+                found, value = self.app_config_cache.get(key)
+                if found:
+                    return value
+                logging.log(logging.WARNING, f"[azure] Chave '{key}' não encontrada no cache de configurações, consultando o App Configuration.")
+
             if label:
                 config_setting = self.app_config_client.get_configuration_setting(key, label=label)
             else:
@@ -57,18 +400,28 @@ class Azure:
             logging.log(logging.ERROR, f"Erro ao obter a configuração para a chave '{key}': {str(e)}\nStack Trace:\n{stack_trace}")
             return None
 
-    def get_key_vault_secret(self, secret_name):
+    def get_key_vault_secret(self, secret_name, version=None):
         try:
-            secret = self.secret_client.get_secret(secret_name)
-            return secret.value
+            return secret_cache.get(self.secret_client, secret_name, version)
         except Exception as e:
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro ao obter o segredo '{secret_name}' do Azure Key Vault: {str(e)}\nStack Trace:\n{stack_trace}")
             return None
 
+    def invalidate_secret(self, secret_name):
+        logging.log(logging.WARNING, f"[azure] Invalidando o segredo '{secret_name}' do cache.")
+        secret_cache.invalidate(secret_name)
+
+    def _handle_blob_auth_error(self, error):
+        # Connection string do storage possivelmente rotacionada: descarta o segredo e recria o cliente
+        if is_auth_error(error):
+            self.invalidate_secret('BlobConnectionString')
+            self.blob_service_client = self._initialize_blob_service_client()
+            self.sas_service.invalidate()
+
     def get_function_ip(self):
         try:
-            response = requests.get("https://ifconfig.me/ip")
+            response = http_client.get("https://ifconfig.me/ip")
             response.raise_for_status()  # Isso garantirá que erros HTTP sejam capturados como exceções
             return response.text.strip()
         except requests.RequestException as e:
@@ -164,76 +517,92 @@ class Azure:
             logging.log(logging.ERROR, f"Erro ao inicializar o Blob Service Client: {str(e)}")
             raise
 
-    def generate_sas_url(self, container_name, blob_name):
-        try:
-            container_client = self.blob_service_client.get_container_client(container_name)
-            blob_client = container_client.get_blob_client(blob_name)
+    @staticmethod
+    def _default_sas_expiry():
+        # Define a data de expiração para 31 de dezembro do ano corrente às 23:59:59 (UTC)
+        return datetime(datetime.now(timezone.utc).year, 12, 31, 23, 59, 59, tzinfo=timezone.utc)
 
-            # Define a data de expiração para 31 de dezembro do ano corrente às 23:59:59
-            expiration_date = datetime(datetime.now().year, 12, 31, 23, 59, 59)
-            
-            # Define as permissões da URL SAS (leitura)
-            sas_permissions = BlobSasPermissions(read=True)
-
-            # Gera a URL SAS
-            sas_url = generate_blob_sas(
-                blob_client.account_name,
-                blob_client.container_name,
-                blob_client.blob_name,
-                account_key=blob_client.credential.account_key,
-                permission=sas_permissions,
-                expiry=expiration_date
-            )
-
-            # Monta a URL completa
-            full_url = f"{blob_client.url}?{sas_url}"
-            return full_url
+    def generate_sas_url(self, container_name, blob_name, expiry=None):
+        try:
+            return self.generate_sas_urls(container_name, [blob_name], expiry)[blob_name]
         except Exception as e:
             logging.log(logging.ERROR, f"Erro ao gerar URL SAS: {str(e)}")
             raise
+
+    def generate_sas_urls(self, container_name, blob_names, expiry=None):
+        try:
+            # Um único token de leitura do contêiner (em cache por janela de expiração) assina todas as URLs
+            return self.sas_service.generate_urls(container_name, blob_names, expiry or self._default_sas_expiry())
+        except Exception as e:
+            logging.log(logging.ERROR, f"Erro ao gerar URLs SAS: {str(e)}")
+            raise
         
     def _create_container_if_not_exists(self, container_name):
+        if container_name in self._known_containers:
+            return
         try:
             container_client = self.blob_service_client.get_container_client(container_name)
-            if not container_client.exists():
+            try:
                 container_client.create_container()
+            except ResourceExistsError:
+                pass
+            self._known_containers.add(container_name)
         except Exception as e:
             logging.log(logging.ERROR, f"Erro ao criar o contêiner: {str(e)}")
             raise
 
+    @staticmethod
+    def _is_container_not_found(error):
+        return isinstance(error, ResourceNotFoundError) and getattr(error, "error_code", None) in (None, "ContainerNotFound")
+
+    def _upload_to_container(self, container_name, upload):
+        self._create_container_if_not_exists(container_name)  # Verifica e cria o contêiner se não existir
+        try:
+            return upload()
+        except HttpResponseError as e:
+            if not self._is_container_not_found(e):
+                raise
+            # O contêiner foi removido depois de verificado: descarta do cache, recria e tenta uma única vez
+            logging.log(logging.WARNING, f"[azure] Contêiner '{container_name}' não encontrado no upload, recriando.")
+            self._known_containers.discard(container_name)
+            self._create_container_if_not_exists(container_name)
+            return upload()
+
     def upload_blob_from_disk(self, container_name, blob_name, file_path):
         try:
-            self._create_container_if_not_exists(container_name)  # Verifica e cria o contêiner se não existir
-            
             blob_client = self.blob_service_client.get_blob_client(container=container_name, blob=blob_name)
-            with open(file_path, "rb") as data:
-                blob_client.upload_blob(data)
+
+            def upload():
+                with open(file_path, "rb") as data:
+                    blob_client.upload_blob(data)
+
+            self._upload_to_container(container_name, upload)
             
             return True
         except Exception as e:
             logging.log(logging.ERROR, f"Erro ao fazer upload do blob: {str(e)}")
+            self._handle_blob_auth_error(e)
             raise
 
     def upload_blob_image(self, container_name, blob_name, image_data):
         try:
-            self._create_container_if_not_exists(container_name)  # Verifica e cria o contêiner se não existir
             container_client = self.blob_service_client.get_container_client(container_name)
 
-            # Verifica se image_data é um objeto Image e o converte para BytesIO
+            # Verifica se image_data é um objeto Image e o converte para bytes
             if isinstance(image_data, Image.Image):
                 buffer = io.BytesIO()
                 image_data.save(buffer, format='JPEG')
-                buffer.seek(0)
-                binary_data = buffer
+                binary_data = buffer.getvalue()
             else:
                 binary_data = image_data
 
             # Fazendo o upload do blob
-            container_client.upload_blob(blob_name, binary_data)
+            self._upload_to_container(container_name, lambda: container_client.upload_blob(blob_name, binary_data))
             
             return True
         except Exception as e:
             logging.log(logging.ERROR, f"Erro ao fazer upload do blob: {str(e)}")
+            self._handle_blob_auth_error(e)
             raise
 
     def _container_exists(self, container_name):
@@ -258,17 +627,16 @@ class Azure:
 
     def return_blob_as_image(self, blob_url):
         try:
-            # Faça uma solicitação HTTP para a URL SAS
-            response = requests.get(blob_url)
+            # Busca o blob pela URL SAS, servindo do cache em disco quando possível
+            status_code, blob_data = asset_cache.fetch(blob_url)
 
             # Verifique se a solicitação foi bem-sucedida (código 200)
-            if response.status_code == 200:
-                # Lê o conteúdo da resposta e o converte em uma imagem PIL
-                blob_data = response.content
+            if status_code == 200:
+                # Converte o conteúdo em uma imagem PIL
                 image = Image.open(io.BytesIO(blob_data))
                 return image
             else:
-                logging.log(logging.ERROR, f"Erro ao baixar o blob. Código de resposta: {response.status_code}")
+                logging.log(logging.ERROR, f"Erro ao baixar o blob. Código de resposta: {status_code}")
                 return None
         except Exception as e:
             logging.log(logging.ERROR, f"Erro ao baixar o blob: {str(e)}")
@@ -276,12 +644,11 @@ class Azure:
 
     def return_blob_as_binary(self, blob_url):
         try:
-            response = requests.get(blob_url)
-            if response.status_code == 200:
-                font_data = response.content
+            status_code, font_data = asset_cache.fetch(blob_url)
+            if status_code == 200:
                 return io.BytesIO(font_data)
             else:
-                logging.log(logging.ERROR, f"Erro ao baixar a fonte. Código de resposta: {response.status_code}")
+                logging.log(logging.ERROR, f"Erro ao baixar a fonte. Código de resposta: {status_code}")
                 return None
         except Exception as e:
             logging.log(logging.ERROR, f"Erro ao baixar a fonte: {str(e)}")
@@ -289,14 +656,61 @@ class Azure:
         
     def return_blob_as_text(self, blob_url):
         try:
-            response = requests.get(blob_url)
-            if response.status_code == 200:
-                data = response.content.decode('utf-8')  # Decodifica os bytes como texto UTF-8
+            status_code, blob_data = asset_cache.fetch(blob_url)
+            if status_code == 200:
+                data = blob_data.decode('utf-8')  # Decodifica os bytes como texto UTF-8
                 return data
             else:
-                logging.log(logging.ERROR, f"Erro ao baixar o blob. Código de resposta: {response.status_code}")
+                logging.log(logging.ERROR, f"Erro ao baixar o blob. Código de resposta: {status_code}")
                 return None
         except Exception as e:
             logging.log(logging.ERROR, f"Erro ao baixar o blob: {str(e)}")
             return None
 
+    def return_blob_as_text_with_etag(self, blob_url):
+        try:
+            status_code, blob_data, etag = asset_cache.fetch_with_etag(blob_url)
+            if status_code == 200:
+                return blob_data.decode('utf-8'), etag
+            else:
+                logging.log(logging.ERROR, f"Erro ao baixar o blob. Código de resposta: {status_code}")
+                return None, None
+        except Exception as e:
+            logging.log(logging.ERROR, f"Erro ao baixar o blob: {str(e)}")
+            return None, None
+
+# Instância compartilhada do cliente Azure, construída sob demanda na primeira utilização
+_azure_client = None
+_azure_client_lock = threading.Lock()
+_azure_client_factory = Azure
+
+def get_azure_client():
+    global _azure_client
+    client = _azure_client
+    if client is None:
+        with _azure_client_lock:
+            if _azure_client is None:
+                logging.log(logging.INFO, "[azure] Inicializando cliente Azure compartilhado.")
+                _azure_client = _azure_client_factory()
+            client = _azure_client
+    return client
+
+def set_azure_client_factory(factory):
+    """Define a fábrica usada para construir o cliente compartilhado (ex.: dublês em testes) e descarta a instância atual."""
+    global _azure_client, _azure_client_factory
+    with _azure_client_lock:
+        _azure_client_factory = factory if factory is not None else Azure
+        _azure_client = None
+
+def reset_azure_client():
+    global _azure_client
+    with _azure_client_lock:
+        _azure_client = None
+
+class LazyAzureClient:
+    """Proxy que resolve o cliente compartilhado apenas no primeiro acesso a um atributo."""
+
+    def __getattr__(self, name):
+        return getattr(get_azure_client(), name)
+
+azure_client = LazyAzureClient()
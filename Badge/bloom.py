@@ -0,0 +1,90 @@
+import math
+import hashlib
+import threading
+
+class BloomFilter:
+    """Filtro de Bloom de capacidade fixa, dimensionado para a taxa de falsos positivos desejada."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Hashing duplo (Kirsch-Mitzenmacher): k posições derivadas de dois hashes de 64 bits
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def is_full(self):
+        return self.count >= self.capacity
+
+    @property
+    def memory_bytes(self):
+        return len(self.bits)
+
+    def estimated_error_rate(self):
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+class ScalableBloomFilter:
+    """
+    Filtro de Bloom escalável: quando o filtro corrente atinge a capacidade, um novo filtro é criado com
+    capacidade multiplicada por growth e taxa de erro multiplicada por tightening, mantendo a taxa composta
+    abaixo de error_rate / (1 - tightening).
+    """
+
+    def __init__(self, initial_capacity=10000, error_rate=0.001, growth=2, tightening=0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = []
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        with self._lock:
+            if key in self:
+                return
+            if not self.filters or self.filters[-1].is_full:
+                index = len(self.filters)
+                self.filters.append(BloomFilter(
+                    self.initial_capacity * self.growth ** index,
+                    self.error_rate * (1 - self.tightening) * self.tightening ** index
+                ))
+            self.filters[-1].add(key)
+
+    def __contains__(self, key):
+        return any(key in bloom for bloom in reversed(self.filters))
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    def estimated_error_rate(self):
+        probability_no_false_positive = 1.0
+        for bloom in self.filters:
+            probability_no_false_positive *= 1 - bloom.estimated_error_rate()
+        return 1 - probability_no_false_positive
+
+    def stats(self):
+        return {
+            "count": len(self),
+            "filters": len(self.filters),
+            "capacity": sum(bloom.capacity for bloom in self.filters),
+            "bits": sum(bloom.num_bits for bloom in self.filters),
+            "memory_bytes": sum(bloom.memory_bytes for bloom in self.filters),
+            "target_error_rate": self.error_rate,
+            "estimated_error_rate": self.estimated_error_rate(),
+        }
@@ -6,14 +6,45 @@ import datetime
 import json
 import logging
 import urllib.parse
+import time
+import uuid
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 
-from .database import Database
+from .database import Database, BadgePage, InvalidContinuationToken, get_pool_stats, get_bloom_stats, get_revocation_stats
 from . import helpers
 from . import azure
+from .cache import LRUCache
 
 
-# Configuração do cliente Azure
-azure_client = azure.Azure()
+# Cliente Azure compartilhado, inicializado sob demanda
+azure_client = azure.azure_client
+
+# Validade das URLs SAS de curta duração servidas pelo redirecionamento de imagens (janela, em segundos)
+IMAGE_REDIRECT_SAS_TTL = int(os.getenv("BADGE_IMAGE_REDIRECT_SAS_TTL", "3600"))
+
+# Mapa GUID -> (contêiner, blob) das imagens de badges já resolvidas
+badge_blob_cache = LRUCache("badge_blobs", max_entries=int(os.getenv("BADGE_BLOB_CACHE_MAX_ENTRIES", "10000")))
+
+# Dados fixos dos badges emitidos por esta API
+BADGE_NAME = "Champion da Engenharia"
+BADGE_DESCRIPTION = "Concedido por ser referência na sua área."
+BADGE_MAIN_CATEGORY = "Engenharia"
+
+# Quando ativo, o QR Code carrega um token de validação assinado em vez do GUID do badge
+QR_VALIDATION_TOKENS = os.getenv("BADGE_QR_VALIDATION_TOKENS", "0") == "1"
+
+# Emissão em lote: limite de itens por requisição e paralelismo da renderização e dos uploads
+BULK_MAX_ITEMS = int(os.getenv("BADGE_BULK_MAX_ITEMS", "100"))
+BULK_RENDER_WORKERS = int(os.getenv("BADGE_BULK_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+BULK_UPLOAD_WORKERS = int(os.getenv("BADGE_BULK_UPLOAD_WORKERS", "8"))
+
+# Consultas de leitura por GUID (validação e postagem); badges são imutáveis após a emissão, o TTL limita a defasagem de revogações
+badge_lookup_cache = LRUCache(
+    "badge_lookups",
+    max_entries=int(os.getenv("BADGE_LOOKUP_CACHE_MAX_ENTRIES", "10000")),
+    ttl=int(os.getenv("BADGE_LOOKUP_CACHE_TTL", "600"))
+)
 
 def get_configs():
     try:
@@ -75,6 +106,149 @@ def get_configs():
         logging.log(logging.ERROR, f"Erro ao recuperar informações: {str(e)}\nStack Trace:\n{stack_trace}")
         return {"error": f"Erro interno no servidor: {str(e)}\nStack Trace:\n{stack_trace}"}, 418
         
+def load_emission_context(db, issuer_name, area_name):
+    """
+    Resolve os recursos compartilhados por todos os badges de um emissor/área (URL de verificação, template,
+    cabeçalho, camada estática, contêiner e validador do schema). Retorna (contexto, None) ou (None, erro).
+    """
+    logging.log(logging.INFO, f"[business] Carregar URL de verificação do Badge.")
+    base_url = azure_client.get_app_config_setting('BadgeVerificationUrl')
+    logging.log(logging.INFO, f"[business] URL de verificação do Badge: {base_url}.")
+    if not base_url:
+        logging.log(logging.ERROR, "Falha ao carregar a URL de verificação do badge.")
+        return None, ({"error": "Falha ao gerar badge.1"}, 418)
+
+    if not helpers.validar_url_https(base_url):
+        logging.log(logging.ERROR, "URL de verificação do badge inválida.")
+        return None, ({"error": "Falha ao gerar badge.2"}, 418)
+
+    # Carregar template de imagem
+    badge_template_info  = db.get_badge_template(issuer_name, area_name)
+    if not badge_template_info:
+        logging.log(logging.ERROR, "Template de badge não encontrado.")
+        return None, ({"error": "Falha ao gerar badge.3"}, 418)
+
+    logging.log(logging.INFO, f"[business] Recuperado informações de header do Badge.")
+    header_info = azure_client.get_app_config_setting('BadgeHeaderInfo')
+    header_info = json.loads(header_info)
+
+    owner_namer_position = tuple(header_info[0].get("position"))
+    owner_name_font_url = header_info[0].get("font")
+    owner_name_font_size = header_info[0].get("size")
+    owner_name_color = tuple(header_info[0].get("color"))
+
+    issuer_name_position = tuple(header_info[1].get("position"))
+    issuer_name_font_url = header_info[1].get("font")
+    issuer_name_font_size = header_info[1].get("size")
+    issuer_name_color = tuple(header_info[1].get("color"))
+
+    area_position = tuple(badge_template_info["AreaDetails"]["Position"])
+    area_font_url = badge_template_info["AreaDetails"]["FontPath"]
+    area_font_size = badge_template_info["AreaDetails"]["Size"]
+    area_color = tuple(badge_template_info["AreaDetails"]["Color"])  # Converter a lista em uma tupla
+
+    icon = badge_template_info["ContentDetails"]["Content"]
+    icon_position = tuple(badge_template_info["ContentDetails"]["Position"])
+    icon_font_url = badge_template_info["ContentDetails"]["FontPath"]
+    icon_size = badge_template_info["ContentDetails"]["Size"]
+    icon_color = tuple(badge_template_info["ContentDetails"]["Color"])  # Converter a lista em uma tupla
+
+    logging.log(logging.INFO, f"[business] Gerando dados a serem escritos no Badge.")
+    # Textos iguais para todos os badges do emissor/área: renderizados uma vez na camada estática
+    static_text_data_json = [
+        {"content": f"Emissor: {issuer_name}", "position": issuer_name_position, "font": issuer_name_font_url, "size": issuer_name_font_size, "color": issuer_name_color},
+        {"content": area_name, "position": area_position, "font": area_font_url, "size": area_font_size, "color": area_color},
+        {"content": icon, "position": icon_position, "font": icon_font_url, "size": icon_size, "color": icon_color}
+    ]
+    holder_text_style = {"position": owner_namer_position, "font": owner_name_font_url, "size": owner_name_font_size, "color": owner_name_color}
+
+    logging.log(logging.INFO, f"[business] Carregar camada estática do Badge (template, área e ícone).")
+    # A camada em cache vai no contexto; cada badge desenha sobre a sua cópia em render_badge
+    static_layer = helpers.get_static_badge_layer(issuer_name, area_name, badge_template_info, static_text_data_json)
+    if not static_layer:
+        logging.log(logging.ERROR, "Falha ao carregar template de badge.")
+        return None, ({"error": "Falha ao gerar badge.4"}, 418)
+
+    container_name = azure_client.get_app_config_setting('BadgeContainerName')
+    if not container_name:
+        logging.log(logging.ERROR, "Falha ao obter nome do container do Azure.")
+        return None, ({"error": "Falha ao gerar badge.9"}, 418)
+
+    badge_db_schema_url  = urllib.parse.unquote(azure_client.get_app_config_setting('BadgeDBSchemaURL'))
+    badge_db_schema_validator = helpers.get_schema_validator(badge_db_schema_url)
+
+    return {
+        "issuer_name": issuer_name,
+        "area_name": area_name,
+        "base_url": base_url,
+        "static_layer": static_layer,
+        "holder_text_style": holder_text_style,
+        "container_name": container_name,
+        "schema_validator": badge_db_schema_validator,
+    }, None
+
+def qr_code_data(badge_guid, owner_name, issuer_name, area_name, issued_date):
+    if QR_VALIDATION_TOKENS:
+        return helpers.issue_validation_token(badge_guid, owner_name, issuer_name, area_name, issued_date)
+    return badge_guid
+
+def render_badge(context, owner_name, qr_code_img):
+    """Desenha o detentor e o QR Code sobre uma cópia da camada estática. Retorna (imagem, None) ou (None, erro)."""
+    badge_template = context["static_layer"].copy()
+
+    logging.log(logging.INFO, f"[business] Adicionando texto ao Badge.")
+    holder_text_data_json = [{"content": f"Detentor: {owner_name}", **context["holder_text_style"]}]
+    badge_template = helpers.add_text_to_badge(badge_template, holder_text_data_json)
+    if badge_template is None:
+        logging.log(logging.ERROR, "Falha ao editar badge. ")
+        return None, ({"error": "Falha ao gerar badge.5"}, 418)
+
+    if qr_code_img is None:
+        logging.log(logging.ERROR, "Falha ao gerar QR Code. ")
+        return None, ({"error": "Falha ao gerar badge.6"}, 418)
+
+    logging.log(logging.INFO, f"[business] Inserindo QRCode no Badge.")
+    badge_template = helpers.colar_qr_code(badge_template, qr_code_img)
+    if badge_template is None:
+        logging.log(logging.ERROR, "Falha ao inserir QRCode.")
+        return None, ({"error": "Falha ao gerar badge.7"}, 418)
+
+    return badge_template, None
+
+def build_badge_json(badge_guid, owner_name, issuer_name, area_name, badge_url, issued_date, signature_record):
+    logging.log(logging.INFO, f"[business] Gerando JSON do Badge.")
+    badge_json = {}
+    badge_json["issuer"] = {}
+    badge_json["issuer"]["contactInfo"] = {}
+    badge_json["holder"] = {}
+    badge_json["category"] = {}
+    badge_json["generatedBadge"] = {}
+    badge_json["generatedBadge"]["metadata"] = {}
+
+    badge_json["badgeId"] = badge_guid
+    badge_json["name"] = BADGE_NAME
+    badge_json["description"] = BADGE_DESCRIPTION
+    badge_json["issuer"]["name"] = issuer_name
+    badge_json["issuer"]["contactInfo"]["email"] = ""
+    badge_json["issuer"]["contactInfo"]["phone"] = ""
+    badge_json["holder"]["name"] = owner_name
+    badge_json["holder"]["email"] = ""
+    badge_json["category"]["mainCategory"] = BADGE_MAIN_CATEGORY
+    badge_json["category"]["subCategory"] = area_name
+    badge_json["generatedBadge"]["badgeImageUrl"] = badge_url
+    badge_json["generatedBadge"]["metadata"]["issuedDate"] = issued_date
+    badge_json["generatedBadge"]["metadata"]["expiryDate"] = ""
+    badge_json["generatedBadge"]["metadata"]["additionalInfo"] = ""
+    badge_json["generatedBadge"]["signature"] = signature_record
+    badge_json["verificationLink"] = ""
+    return badge_json
+
+def check_badge_schema(context, badge_json):
+    badge_db_schema_validator = context["schema_validator"]
+    badge_data = badge_db_schema_validator is not None and helpers.validate_data_into_json_schema(badge_db_schema_validator, badge_json)
+    if not badge_data:
+        logging.log(logging.WARNING, f"[business] Deu ruim na analise do schema.")
+
 def generate_badge(data):
     try:
         # Validação e análise dos dados recebidos
@@ -89,17 +263,6 @@ def generate_badge(data):
 
         logging.log(logging.INFO, f"Gerando badge para {owner_name} emitido por {issuer_name}")
 
-        logging.log(logging.INFO, f"[business] Carregar URL de verificação do Badge.")
-        base_url = azure_client.get_app_config_setting('BadgeVerificationUrl')
-        logging.log(logging.INFO, f"[business] URL de verificação do Badge: {base_url}.")
-        if not base_url:
-            logging.log(logging.ERROR, "Falha ao carregar a URL de verificação do badge.")
-            return {"error": "Falha ao gerar badge.1"}, 418
-        
-        if not helpers.validar_url_https(base_url):
-            logging.log(logging.ERROR, "URL de verificação do badge inválida.")
-            return {"error": "Falha ao gerar badge.2"}, 418
- 
         logging.log(logging.INFO, f"[business] Gerando GUID do Badge.")
         badge_guid = helpers.gera_guid_badge() 
         
@@ -109,90 +272,31 @@ def generate_badge(data):
 
         db = Database()
 
-        # Carregar template de imagem
-        badge_template_info  = db.get_badge_template(issuer_name, area_name)
-        if not badge_template_info:
-            logging.log(logging.ERROR, "Template de badge não encontrado.")
-            return {"error": "Falha ao gerar badge.3"}, 418
-
-        blob_url = badge_template_info.get('BlobUrl')
-
-        logging.log(logging.INFO, f"[business] Carregar template de imagem.")
-        badge_template = azure_client.return_blob_as_image(blob_url)
-        if not badge_template:
-            logging.log(logging.ERROR, "Falha ao carregar template de badge.")
-            return {"error": "Falha ao gerar badge.4"}, 418
-
-        logging.log(logging.INFO, f"[business] Convertendo para JPG com fundo branco.")
-        badge_template = helpers.convert_image_to_jpg(badge_template)
-
-        logging.log(logging.INFO, f"[business] Recuperado informações de header do Badge.")
-        header_info = azure_client.get_app_config_setting('BadgeHeaderInfo')
-        header_info = json.loads(header_info)
-
-        owner_namer_position = tuple(header_info[0].get("position"))
-        owner_name_font_url = header_info[0].get("font")
-        owner_name_font_size = header_info[0].get("size")
-        owner_name_color = tuple(header_info[0].get("color"))
-
-        issuer_name_position = tuple(header_info[1].get("position"))
-        issuer_name_font_url = header_info[1].get("font")
-        issuer_name_font_size = header_info[1].get("size")
-        issuer_name_color = tuple(header_info[1].get("color"))
-
-        area_position = tuple(badge_template_info["AreaDetails"]["Position"])
-        area_font_url = badge_template_info["AreaDetails"]["FontPath"]
-        area_font_size = badge_template_info["AreaDetails"]["Size"]
-        area_color = tuple(badge_template_info["AreaDetails"]["Color"])  # Converter a lista em uma tupla
-
-        icon = badge_template_info["ContentDetails"]["Content"]
-        icon_position = tuple(badge_template_info["ContentDetails"]["Position"])
-        icon_font_url = badge_template_info["ContentDetails"]["FontPath"]
-        icon_size = badge_template_info["ContentDetails"]["Size"]
-        icon_color = tuple(badge_template_info["ContentDetails"]["Color"])  # Converter a lista em uma tupla
-
-        logging.log(logging.INFO, f"[business] Gerando dados a serem escritos no Badge.")
-        text_data_json = [
-            {"content": f"Detentor: {owner_name}", "position": owner_namer_position, "font": owner_name_font_url, "size": owner_name_font_size, "color": owner_name_color},
-            {"content": f"Emissor: {issuer_name}", "position": issuer_name_position, "font": issuer_name_font_url, "size": issuer_name_font_size, "color": issuer_name_color},
-            {"content": area_name, "position": area_position, "font": area_font_url, "size": area_font_size, "color": area_color},
-            {"content": icon, "position": icon_position, "font": icon_font_url, "size": icon_size, "color": icon_color}
-        ]
-
-        logging.log(logging.INFO, f"[business] Adicionando texto ao Badge.")
-        badge_template = helpers.add_text_to_badge(badge_template, text_data_json)
-        if badge_template is None:
-            logging.log(logging.ERROR, "Falha ao editar badge. ")
-            return {"error": "Falha ao gerar badge.5"}, 418 
+        context, error = load_emission_context(db, issuer_name, area_name)
+        if error:
+            return error
+
+        issued_date = datetime.datetime.now()
 
         logging.log(logging.INFO, f"[business] Gerando QRCode do Badge.")
-        qr_code_img = helpers.create_qr_code(badge_guid, base_url, box_size=10, border=4)
-        if qr_code_img is None:
-            logging.log(logging.ERROR, "Falha ao gerar QR Code. ")
-            return {"error": "Falha ao gerar badge.6"}, 418 
+        qr_code_img = helpers.create_qr_code(qr_code_data(badge_guid, owner_name, issuer_name, area_name, issued_date), context["base_url"], box_size=10, border=4, max_width=context["static_layer"].width)
 
-        logging.log(logging.INFO, f"[business] Inserindo QRCode no Badge.")
-        badge_template = helpers.colar_qr_code(badge_template, qr_code_img)
-        if badge_template is None:
-            logging.log(logging.ERROR, "Falha ao inserir QRCode.")
-            return {"error": "Falha ao gerar badge.7"}, 418 
+        badge_template, error = render_badge(context, owner_name, qr_code_img)
+        if error:
+            return error
 
         logging.log(logging.INFO, "[business] Inserindo dados EXIF no Badge.")
         result = helpers.process_badge_image(badge_template, issuer_name)
         if result is not None:
-            badge_hash, badge_base64, signed_hash, badge_template = result
+            badge_hash, badge_base64, signed_hash, badge_bytes = result
         else:
             logging.log(logging.ERROR, "Falha ao editar EXIF do badge.")
             return {"error": "Falha ao gerar badge.8"}, 418
 
         logging.log(logging.INFO, f"[business] Upload do Badge para o Azure")
-        container_name = azure_client.get_app_config_setting('BadgeContainerName')
-        if not container_name:
-            logging.log(logging.ERROR, "Falha ao obter nome do container do Azure.")
-            return {"error": "Falha ao gerar badge.9"}, 418
-        
+        container_name = context["container_name"]
         blob_name = f"{badge_guid}.jpg"
-        success = azure_client.upload_blob_image(container_name, blob_name, badge_template)
+        success = azure_client.upload_blob_image(container_name, blob_name, badge_bytes)
         if not success:
             logging.log(logging.ERROR, "Falha ao enviar o badge para storage.")
             return {"error": "Falha ao gerar badge.10"}, 418
@@ -203,36 +307,9 @@ def generate_badge(data):
             logging.log(logging.ERROR, "Falha ao gerar URL do badge.")
             return {"error": "Falha ao gerar badge.11"}, 418
 
-        logging.log(logging.INFO, f"[business] Gerando JSON do Badge.")
-        badge_json = {}
-        badge_json["issuer"] = {}
-        badge_json["issuer"]["contactInfo"] = {}
-        badge_json["holder"] = {}
-        badge_json["category"] = {}
-        badge_json["generatedBadge"] = {}
-        badge_json["generatedBadge"]["metadata"] = {}
-
-        badge_json["badgeId"] = badge_guid
-        badge_json["name"] = "Champion da Engenharia"
-        badge_json["description"] = "Concedido por ser referência na sua área."
-        badge_json["issuer"]["name"] = issuer_name
-        badge_json["issuer"]["contactInfo"]["email"] = ""
-        badge_json["issuer"]["contactInfo"]["phone"] = ""
-        badge_json["holder"]["name"] = owner_name
-        badge_json["holder"]["email"] = ""
-        badge_json["category"]["mainCategory"] = "Engenharia"
-        badge_json["category"]["subCategory"] = area_name
-        badge_json["generatedBadge"]["badgeImageUrl"] = badge_url
-        badge_json["generatedBadge"]["metadata"]["issuedDate"] = datetime.datetime.now()
-        badge_json["generatedBadge"]["metadata"]["expiryDate"] = ""
-        badge_json["generatedBadge"]["metadata"]["additionalInfo"] = ""
-        badge_json["verificationLink"] = ""
-
-        badge_db_schema_url  = urllib.parse.unquote(azure_client.get_app_config_setting('BadgeDBSchemaURL'))
-        badge_db_schema  = azure_client.return_blob_as_text(badge_db_schema_url)
-        badge_data = helpers.validate_data_into_json_schema(badge_db_schema, badge_json)
-        if badge_data is None:
-            logging.log(logging.WARNING, f"[business] Deu ruim na analise do schema.")
+        signature_record = helpers.build_single_signature_record(badge_hash, signed_hash)
+        badge_json = build_badge_json(badge_guid, owner_name, issuer_name, area_name, badge_url, issued_date, signature_record)
+        check_badge_schema(context, badge_json)
 
         logging.log(logging.INFO, f"[business] Gravando Badge no banco.")
         result = db.insert_badge_json(badge_json)
@@ -247,6 +324,194 @@ def generate_badge(data):
         logging.log(logging.ERROR, f"Erro ao gerar badge: {str(e)}\nStack Trace:\n{stack_trace}")
         return {"error": f"Erro interno no servidor: {str(e)}\nStack Trace:\n{stack_trace}"}, 418
 
+def generate_badges(data):
+    """
+    Emissão em lote para um mesmo emissor/área: os recursos compartilhados são resolvidos uma vez, os badges são
+    renderizados em paralelo, assinados por uma única raiz de Merkle, enviados ao storage concorrentemente e gravados
+    com um único insert_many não ordenado. Cada item do resultado informa sucesso ou o motivo da falha.
+    """
+    try:
+        logging.log(logging.INFO, f"[business] Endpoint para emitir badges em lote.")
+        holders = data.get('holders')
+        if 'issuer_name' not in data or 'area_name' not in data or not isinstance(holders, list) or not holders:
+            logging.log(logging.ERROR, "Dados de entrada faltando: 'holders' ou 'issuer_name' ou 'area_name'")
+            return {"error": "Falha ao gerar badges."}, 418
+
+        if len(holders) > BULK_MAX_ITEMS:
+            return {"error": f"Máximo de {BULK_MAX_ITEMS} badges por requisição."}, 400
+
+        issuer_name = data['issuer_name']
+        area_name = data['area_name']
+
+        results = []
+        for index, holder in enumerate(holders):
+            owner_name = holder.get('owner_name') if isinstance(holder, dict) else None
+            result = {"index": index, "owner_name": owner_name}
+            if not owner_name:
+                result.update({"status": "error", "error": "Dado de entrada faltando: 'owner_name'"})
+            else:
+                result.update({"status": "pending", "badge_guid": helpers.gera_guid_badge()})
+            results.append(result)
+
+        def fail(result, error):
+            result["status"] = "error"
+            result["error"] = error
+
+        def pending():
+            return [result for result in results if result["status"] == "pending"]
+
+        db = Database()
+        context, error = load_emission_context(db, issuer_name, area_name)
+        if error:
+            return error
+
+        issued_date = datetime.datetime.now()
+
+        logging.log(logging.INFO, f"[business] Gerando QRCodes de {len(pending())} badges.")
+        qr_data_list = [qr_code_data(result["badge_guid"], result["owner_name"], issuer_name, area_name, issued_date) for result in pending()]
+        qr_code_imgs = helpers.create_qr_codes(qr_data_list, context["base_url"], box_size=10, border=4, max_width=context["static_layer"].width) or [None] * len(qr_data_list)
+
+        def render(result, qr_code_img):
+            badge_template, error = render_badge(context, result["owner_name"], qr_code_img)
+            if error:
+                return None, error[0]["error"]
+            processed = helpers.process_badge_image(badge_template, issuer_name, sign=False)
+            if processed is None:
+                return None, "Falha ao gerar badge.8"
+            return processed, None
+
+        logging.log(logging.INFO, f"[business] Renderizando badges com {BULK_RENDER_WORKERS} workers.")
+        rendered = {}
+        with ThreadPoolExecutor(max_workers=BULK_RENDER_WORKERS) as executor:
+            batch = pending()
+            for result, (processed, error) in zip(batch, executor.map(render, batch, qr_code_imgs)):
+                if error:
+                    fail(result, error)
+                else:
+                    rendered[result["index"]] = processed
+
+        if not pending():
+            return {"results": results, "succeeded": 0, "failed": len(results)}, 418
+
+        # Uma única assinatura PGP (raiz de Merkle) para todo o lote
+        batch = pending()
+        signature_records = helpers.sign_badge_hashes([rendered[result["index"]][0] for result in batch])
+
+        def upload(result):
+            try:
+                blob_name = f"{result['badge_guid']}.jpg"
+                if not azure_client.upload_blob_image(context["container_name"], blob_name, rendered[result["index"]][3]):
+                    return "Falha ao gerar badge.10"
+            except Exception as e:
+                logging.log(logging.ERROR, f"Falha ao enviar o badge {result['badge_guid']} para storage: {str(e)}")
+                return "Falha ao gerar badge.10"
+            return None
+
+        logging.log(logging.INFO, f"[business] Upload de {len(batch)} badges com {BULK_UPLOAD_WORKERS} workers.")
+        with ThreadPoolExecutor(max_workers=BULK_UPLOAD_WORKERS) as executor:
+            for result, signature_record, error in zip(batch, signature_records, executor.map(upload, batch)):
+                if error:
+                    fail(result, error)
+                else:
+                    result["signature_record"] = signature_record
+
+        batch = pending()
+        if not batch:
+            return {"results": results, "succeeded": 0, "failed": len(results)}, 418
+
+        badge_urls = azure_client.generate_sas_urls(context["container_name"], [f"{result['badge_guid']}.jpg" for result in batch])
+
+        badges_json = []
+        for result in batch:
+            badge_json = build_badge_json(
+                result["badge_guid"], result["owner_name"], issuer_name, area_name,
+                badge_urls[f"{result['badge_guid']}.jpg"], issued_date, result.pop("signature_record")
+            )
+            check_badge_schema(context, badge_json)
+            badges_json.append(badge_json)
+
+        logging.log(logging.INFO, f"[business] Gravando {len(badges_json)} badges no banco.")
+        inserted = db.insert_badges_json(badges_json)
+        if inserted is None:
+            # Falha sem detalhe por documento (ex.: rede após uma escrita parcial não ordenada): confere o que foi gravado
+            stored = db.find_badge_document_ids(result["badge_guid"] for result in batch) or {}
+            for result in batch:
+                if result["badge_guid"] in stored:
+                    result["status"] = "success"
+                    result["document_id"] = stored[result["badge_guid"]]
+                else:
+                    fail(result, "Falha ao inserir o badge no banco de dados.")
+        else:
+            inserted_ids, write_errors = inserted
+            for position, result in enumerate(batch):
+                if position in inserted_ids:
+                    result["status"] = "success"
+                    result["document_id"] = inserted_ids[position]
+                else:
+                    fail(result, write_errors.get(position, "Falha ao inserir o badge no banco de dados."))
+
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        response = {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+        if not succeeded:
+            return response, 418
+        if succeeded < len(results):
+            return response, 207
+        return response
+
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        logging.log(logging.ERROR, f"Erro ao gerar badges em lote: {str(e)}\nStack Trace:\n{stack_trace}")
+        return {"error": f"Erro interno no servidor: {str(e)}"}, 418
+
+def lookup_badge(kind, badge_guid, loader):
+    """Lê do cache de consultas ou executa loader(); resultados vazios (badge inexistente ou erro) não são guardados."""
+    key = (kind, badge_guid)
+    badge = badge_lookup_cache.get(key)
+    if badge is None:
+        badge = loader()
+        if badge:
+            badge_lookup_cache.put(key, badge)
+    return badge
+
+def load_validated_badge(badge_guid):
+    db = Database()
+    badge = db.validate_badge(badge_guid)
+    if not badge:
+        return None
+
+    badge = badge._asdict()
+    if badge["status"] != "success":
+        return badge
+
+    # A verificação da assinatura é feita uma única vez por entrada do cache
+    signature = badge.pop("signature", None)
+    if signature:
+        badge["signature_valid"] = helpers.verify_badge_signature(signature)
+    return badge
+
+def badge_valid_from_token(claims):
+    """Resposta da validação a partir de um token autêntico, ou None se a revogação não puder ser conferida."""
+    badge_guid = claims["b"]
+    db = Database()
+    revoked = db.is_badge_revoked(badge_guid)
+    if revoked is None:
+        return None
+    if revoked:
+        return {"valid": False, "error": "Badge revogado"}, 404
+
+    container_name = azure_client.get_app_config_setting('BadgeContainerName')
+    badge_image_url, _ = sign_badge_blob((container_name, f"{badge_guid}.jpg"))
+    badge_info = {
+        "holder_name": claims["h"],
+        "issuer_name": claims["i"],
+        "badge_name": BADGE_NAME,
+        "badge_image_url": badge_image_url,
+        "badge_category": f"{BADGE_MAIN_CATEGORY} - {claims['a']}",
+        "emitido_em": datetime.datetime.fromtimestamp(claims["d"]),
+        "status": "success"
+    }
+    return {"valid": True, "verified_by": "token", "badge_info": badge_info}
+
 def badge_image(data):
     try:
         # Validação e análise dos dados recebidos
@@ -258,9 +523,9 @@ def badge_image(data):
         
         logging.log(logging.INFO, f"Recuperando imagem do badge para {badge_guid}.")
         
-        db = Database()
-        badge_image_url = db.get_badge_image(badge_guid)
-        if badge_image_url:
+        badge_blob = resolve_badge_blob(badge_guid)
+        if badge_blob:
+            badge_image_url, _ = sign_badge_blob(badge_blob)
             return {"badge_image_url": badge_image_url}
         else:
             logging.log(logging.WARNING, "Badge não encontrado ou sem imagem associada.")
@@ -271,14 +536,90 @@ def badge_image(data):
         logging.log(logging.ERROR, f"Erro ao recuperar imagem do badge: {str(e)}\nStack Trace:\n{stack_trace}")
         return {"error": "Erro interno no servidor"}, 500
 
+def parse_badge_blob_url(badge_image_url):
+    # A URL gravada tem o formato https://<conta>.blob.core.windows.net/<contêiner>/<blob>?<sas>
+    path = urllib.parse.urlsplit(badge_image_url).path.lstrip('/')
+    container_name, _, blob_name = path.partition('/')
+    if not container_name or not blob_name:
+        return None
+    return container_name, urllib.parse.unquote(blob_name)
+
+def resolve_badge_blob(badge_guid):
+    def loader():
+        db = Database()
+        badge_image_url = db.get_badge_image(badge_guid)
+        badge_blob = parse_badge_blob_url(badge_image_url) if badge_image_url else None
+        if not badge_blob:
+            raise LookupError(badge_guid)
+        return badge_blob, 1
+
+    try:
+        return badge_blob_cache.get_or_load(badge_guid, loader)
+    except LookupError:
+        return None
+
+def sign_badge_blob(badge_blob):
+    container_name, blob_name = badge_blob
+
+    # A expiração é alinhada ao fim da próxima janela para que todos os pedidos da janela reutilizem o mesmo token
+    now = time.time()
+    expiry_timestamp = (int(now // IMAGE_REDIRECT_SAS_TTL) + 2) * IMAGE_REDIRECT_SAS_TTL
+    expiry = datetime.datetime.fromtimestamp(expiry_timestamp, tz=datetime.timezone.utc)
+    badge_url = azure_client.generate_sas_url(container_name, blob_name, expiry)
+
+    # O redirecionamento pode ficar em cache enquanto o token ainda tiver ao menos uma janela de validade
+    max_age = max(0, int(expiry_timestamp - now) - IMAGE_REDIRECT_SAS_TTL)
+    return badge_url, max_age
+
+def refresh_badge_image_url(badge_image_url):
+    # Troca a URL SAS gravada no documento (que expira em 31/12) por uma URL recém-assinada
+    badge_blob = parse_badge_blob_url(badge_image_url) if badge_image_url else None
+    if not badge_blob:
+        return badge_image_url
+    badge_url, _ = sign_badge_blob(badge_blob)
+    return badge_url
+
+def badge_image_redirect(badge_guid):
+    try:
+        try:
+            uuid.UUID(badge_guid)
+        except ValueError:
+            return {"error": "GUID do badge inválido"}, 400
+
+        badge_blob = resolve_badge_blob(badge_guid)
+        if not badge_blob:
+            logging.log(logging.WARNING, f"Badge {badge_guid} não encontrado ou sem imagem associada.")
+            return {"error": "Badge não encontrado ou sem imagem associada"}, 404
+
+        badge_url, max_age = sign_badge_blob(badge_blob)
+        return {"url": badge_url, "max_age": max_age}
+
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        logging.log(logging.ERROR, f"Erro ao redirecionar para a imagem do badge: {str(e)}\nStack Trace:\n{stack_trace}")
+        return {"error": "Erro interno no servidor"}, 500
+
 def badge_valid(data):
     try:
         # Validação e análise dos dados recebidos
-        if 'badge_guid' not in data:
+        if 'badge_guid' not in data and 'data' not in data:
             logging.log(logging.ERROR, "Dados de entrada faltando: 'badge_guid'")
             return {"error": "Dados de entrada inválidos"}, 400
 
-        badge_guid = data['badge_guid']
+        # O QR Code pode trazer o GUID do badge ou um token de validação assinado
+        badge_guid = data.get('badge_guid') or data.get('data')
+
+        claims = helpers.verify_validation_token(badge_guid)
+        if claims:
+            result = badge_valid_from_token(claims)
+            if result is not None:
+                return result
+            badge_guid = claims["b"]
+        elif helpers.looks_like_token(badge_guid):
+            # Token não verificável (ex.: emitido antes de uma rotação de chave): o banco decide
+            badge_guid = helpers.read_badge_id(badge_guid)
+            if not badge_guid:
+                return {"valid": False, "error": "Badge não encontrado ou informações não correspondem"}, 404
                 
         #logging.log(logging.INFO, "Analisando dados enviados.")
 
@@ -304,13 +645,16 @@ def badge_valid(data):
         #    logging.log(logging.ERROR, "Não foi possível decodificar dados informados.")
         #    return {"error": "Dados decodificados inválidos"}, 418
         
-        db = Database()
-        badge = db.validate_badge(badge_guid)
+        badge = lookup_badge("validate", badge_guid, lambda: load_validated_badge(badge_guid))
 
         logging.log(logging.INFO, f"Dados retornados: {badge}")
 
-        if badge and badge.get("status") == "success":
+        if badge and badge.get("status") == "revoked":
+            return {"valid": False, "error": "Badge revogado"}, 404
+        elif badge:
             # O badge foi encontrado e as informações são válidas
+            badge = dict(badge)
+            badge["badge_image_url"] = refresh_badge_image_url(badge.get("badge_image_url"))
             return {"valid": True, "badge_info": badge}
         else:
             # O badge não foi encontrado ou ocorreu um erro durante a validação
@@ -320,6 +664,10 @@ def badge_valid(data):
         logging.log(logging.ERROR, f"Erro ao validar badge: {str(e)}\nStack Trace:\n{stack_trace}")
         return {"error": "Erro interno no servidor"}, 418
      
+def wants_pagination(data):
+    # Sem page_size nem continuation_token as listagens mantêm o formato original: a lista completa, sem envelope
+    return data.get('page_size') is not None or data.get('continuation_token') is not None
+
 def badge_list(data):
     try:
         # Validação e análise dos dados recebidos
@@ -330,9 +678,13 @@ def badge_list(data):
         user_id = data['user_id']
 
         db = Database()
-        badges = db.get_user_badges(user_id)
+        paginated = wants_pagination(data)
+        if paginated:
+            badges = db.get_user_badges(user_id, data.get('page_size'), data.get('continuation_token'))
+        else:
+            badges = BadgePage(list(db.iter_user_badges(user_id)), None)
 
-        if not badges:
+        if not badges or (not badges.items and not data.get('continuation_token')):
             return {"error": "Nenhum badge encontrado para o usuário"}, 404
 
         base_url = azure_client.get_app_config_setting('BadgeVerificationUrl')
@@ -341,19 +693,47 @@ def badge_list(data):
             return {"error": "Falha ao carregar url de verificação do badge"}, 500
 
         badge_list = []
-        for badge in badges:
-            badge_guid = badge.get("badgeId", "")
-            badge_name = badge.get("name", "")
-            validation_url = f"{base_url}/validate?badge_guid={badge_guid}"
-            badge_list.append({"name": badge_name, "validation_url": validation_url})
+        for badge in badges.items:
+            validation_url = f"{base_url}/validate?badge_guid={badge.badge_id}"
+            badge_list.append({"name": badge.name, "validation_url": validation_url})
 
-        return badge_list
+        if not paginated:
+            return badge_list
+        return {"badges": badge_list, "continuation_token": badges.continuation_token}
 
+    except InvalidContinuationToken as e:
+        logging.log(logging.WARNING, str(e))
+        return {"error": "Token de continuação inválido"}, 400
     except Exception as e:
         stack_trace = traceback.format_exc()
         logging.log(logging.ERROR, f"Erro ao listar badges: {str(e)}\nStack Trace:\n{stack_trace}")
         return {"error": "Erro interno no servidor"}, 500
 
+def peek_rows(rows):
+    """Lê a primeira linha antes do streaming: None se não houver linhas, senão um gerador com todas elas."""
+    try:
+        first = next(rows)
+    except StopIteration:
+        return None
+    return itertools.chain([first], rows)
+
+def stream_badge_list(data):
+    """Como badge_list, mas devolve um gerador de linhas lidas direto do cursor (sem paginação)."""
+    if 'user_id' not in data:
+        logging.log(logging.ERROR, "Dados de entrada faltando: 'user_id'")
+        return {"error": "Dados de entrada inválidos"}, 400
+
+    base_url = azure_client.get_app_config_setting('BadgeVerificationUrl')
+    if not base_url:
+        logging.log(logging.ERROR, "Falha ao carregar a URL de verificação do badge.")
+        return {"error": "Falha ao carregar url de verificação do badge"}, 500
+
+    db = Database()
+    badges = peek_rows(db.iter_user_badges(data['user_id']))
+    if badges is None:
+        return {"error": "Nenhum badge encontrado para o usuário"}, 404
+    return ({"name": badge.name, "validation_url": f"{base_url}/validate?badge_guid={badge.badge_id}"} for badge in badges)
+
 def badge_holder(data):
     try:
         # Validação e análise dos dados recebidos
@@ -364,20 +744,41 @@ def badge_holder(data):
         badge_name = data['badge_name']
 
         db = Database()
-        badge_holders = db.get_badge_holders(badge_name)
+        paginated = wants_pagination(data)
+        if paginated:
+            badge_holders = db.get_badge_holders(badge_name, data.get('page_size'), data.get('continuation_token'))
+        else:
+            badge_holders = BadgePage(list(db.iter_badge_holders(badge_name)), None)
 
-        if not badge_holders:
+        if not badge_holders or (not badge_holders.items and not data.get('continuation_token')):
             return {"error": "Nenhum detentor de badge encontrado para este nome de badge"}, 404
 
         # Criando a lista de usuários
-        users = [{'name': holder['name'], 'email': holder['email']} for holder in badge_holders]
-        return users
-
+        users = [holder._asdict() for holder in badge_holders.items]
+        if not paginated:
+            return users
+        return {"holders": users, "continuation_token": badge_holders.continuation_token}
+
+    except InvalidContinuationToken as e:
+        logging.log(logging.WARNING, str(e))
+        return {"error": "Token de continuação inválido"}, 400
     except Exception as e:
         stack_trace = traceback.format_exc()
         logging.log(logging.ERROR, f"Erro ao recuperar detentores do badge: {str(e)}\nStack Trace:\n{stack_trace}")
         return {"error": "Erro interno no servidor"}, 500
 
+def stream_badge_holder(data):
+    """Como badge_holder, mas devolve um gerador de linhas lidas direto do cursor (sem paginação)."""
+    if 'badge_name' not in data:
+        logging.log(logging.ERROR, "Dados de entrada faltando: 'badge_name'")
+        return {"error": "Dados de entrada inválidos"}, 400
+
+    db = Database()
+    badge_holders = peek_rows(db.iter_badge_holders(data['badge_name']))
+    if badge_holders is None:
+        return {"error": "Nenhum detentor de badge encontrado para este nome de badge"}, 404
+    return (holder._asdict() for holder in badge_holders)
+
 def linkedin_post(data):
     try:
         # Validação e análise dos dados recebidos
@@ -387,8 +788,7 @@ def linkedin_post(data):
 
         badge_guid = data['badge_guid']
 
-        db = Database()
-        badge_info = db.get_badge_info_for_post(badge_guid)
+        badge_info = lookup_badge("post", badge_guid, lambda: Database().get_badge_info_for_post(badge_guid))
 
         if not badge_info:
             return {"error": "Badge não encontrado"}, 404
@@ -402,7 +802,7 @@ def linkedin_post(data):
 
         validation_url = f"{base_url}/validate?badge_guid={badge_guid}"
         
-        post_text_template = azure_client.get_app_config_setting('LinkedInPost').replace("\\r\\n", "\r\n")
+        post_text_template = azure_client.get_app_config_setting('LinkedInPost')
         if not post_text_template:
             post_text = (
                 f"Estou muito feliz em compartilhar que acabei de conquistar um novo badge: {badge_name}! "
@@ -412,7 +812,7 @@ def linkedin_post(data):
             )
         else:
             formatter = helpers.SafeFormatter()
-            post_text = formatter.format(format,
+            post_text = formatter.format(post_text_template.replace("\\r\\n", "\r\n"),
                 badge_name=badge_name,
                 additional_info=additional_info,
                 validation_url=validation_url
@@ -425,6 +825,31 @@ def linkedin_post(data):
         logging.log(logging.ERROR, f"Erro ao recuperar a mensagem do post do LinkedIn: {str(e)}\nStack Trace:\n{stack_trace}")
         return {"error": "Erro interno no servidor"}, 500
 
+def get_stats():
+    try:
+        logging.log(logging.INFO, f"[business] Endpoint para recuperar estatísticas de runtime.")
+        data = {}
+        data['MongoPool'] = get_pool_stats()
+        data['BadgeIdFilter'] = get_bloom_stats()
+        data['AppConfigCache'] = azure_client.app_config_cache.stats()
+        data['SecretCache'] = azure.secret_cache.stats()
+        data['HttpPool'] = azure.http_client.stats()
+        data['AssetCache'] = azure.asset_cache.stats()
+        data['SasTokens'] = azure_client.sas_service.stats()
+        data['BadgeBlobCache'] = badge_blob_cache.stats()
+        data['BadgeLookupCache'] = badge_lookup_cache.stats()
+        data['FontCache'] = helpers.font_cache.stats()
+        data['StaticLayerCache'] = helpers.static_layer_cache.stats()
+        data['EmojiCache'] = helpers.emoji_image_cache.stats()
+        data['PGPSigner'] = helpers.pgp_signer.stats()
+        data['ValidationTokens'] = {**helpers.validation_token_signer.stats(), "revocations": get_revocation_stats()}
+        data['SchemaValidatorCache'] = helpers.schema_validator_cache.stats()
+        return data
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        logging.log(logging.ERROR, f"Erro ao recuperar estatísticas: {str(e)}\nStack Trace:\n{stack_trace}")
+        return {"error": "Erro interno no servidor"}, 500
+
 def get_api_version():
     try:
         cwd = os.getcwd()
@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+import urllib.parse
+from collections import OrderedDict
+
+# Parâmetros do cache de assets em disco (podem ser sobrescritos por variáveis de ambiente)
+ASSET_CACHE_DIR = os.getenv("BADGE_ASSET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "badge-assets"))
+ASSET_CACHE_MAX_BYTES = int(os.getenv("BADGE_ASSET_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+ASSET_CACHE_MAX_AGE = int(os.getenv("BADGE_ASSET_CACHE_MAX_AGE", "300"))
+
+class LRUCache:
+    """
+    Cache LRU em memória, thread-safe, limitado por número de entradas e/ou bytes contabilizados.
+    Cada entrada registra o tamanho informado por quem a insere; o TTL é opcional.
+    """
+
+    def __init__(self, name, max_entries=None, max_bytes=None, ttl=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries) or
+            (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[2]):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=1):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self.current_bytes += size
+            self._evict()
+
+    def get_or_load(self, key, loader):
+        """Retorna o valor em cache ou executa loader(), que deve devolver (valor, tamanho)."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        value, size = loader()
+        self.put(key, value, size)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+class AssetCache:
+    """
+    Cache em disco de assets remotos (templates, fontes, schemas), indexado pelo hash da URL.
+    Cada entrada guarda o conteúdo e os metadados (ETag/Last-Modified); após MAX_AGE segundos a entrada
+    é revalidada com requisição condicional. Se a origem estiver inacessível, a cópia em disco é servida
+    mesmo vencida. O tamanho total é limitado com remoção LRU.
+    """
+
+    def __init__(self, http_get, cache_dir=ASSET_CACHE_DIR, max_bytes=ASSET_CACHE_MAX_BYTES, max_age=ASSET_CACHE_MAX_AGE):
+        self.http_get = http_get
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    @staticmethod
+    def cache_key(url):
+        """
+        Chave da entrada: a URL completa, exceto em blobs do Azure Storage, cuja query string é o token SAS
+        (muda a cada geração sem que o conteúdo mude) e por isso é ignorada; nesses casos vale só o caminho do blob.
+        """
+        parts = urllib.parse.urlsplit(url)
+        if parts.netloc.endswith(".blob.core.windows.net"):
+            url = urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, url):
+        key = self.cache_key(url)
+        return os.path.join(self.cache_dir, f"{key}.bin"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def _atomic_write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _read_entry(self, data_path, meta_path):
+        try:
+            with open(meta_path, "r") as meta_file:
+                meta = json.load(meta_file)
+            with open(data_path, "rb") as data_file:
+                data = data_file.read()
+            return meta, data
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_entry(self, data_path, meta_path, meta, data=None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if data is not None:
+            self._atomic_write(data_path, data)
+        self._atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _touch(self, data_path):
+        # O mtime do conteúdo registra o último acesso para a remoção LRU
+        try:
+            os.utime(data_path, None)
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            try:
+                entries = []
+                total = 0
+                for name in os.listdir(self.cache_dir):
+                    if not name.endswith(".bin"):
+                        continue
+                    path = os.path.join(self.cache_dir, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+                if total <= self.max_bytes:
+                    return
+                for _, size, path in sorted(entries):
+                    for entry_path in (path, path[:-4] + ".json"):
+                        if os.path.exists(entry_path):
+                            os.remove(entry_path)
+                    total -= size
+                    self.evictions += 1
+                    if total <= self.max_bytes:
+                        break
+            except OSError as e:
+                logging.log(logging.WARNING, f"[cache] Falha ao limpar o cache de assets: {str(e)}")
+
+    def fetch(self, url):
+        """Retorna (status_code, conteúdo) servindo do disco sempre que possível."""
+        status_code, content, _ = self.fetch_with_etag(url)
+        return status_code, content
+
+    def fetch_with_etag(self, url):
+        """Como fetch(), mas também devolve o ETag da versão servida (ou None)."""
+        data_path, meta_path = self._paths(url)
+        meta, data = self._read_entry(data_path, meta_path)
+
+        if meta is not None and time.time() - meta.get("validated_at", 0) < self.max_age:
+            self.hits += 1
+            self._touch(data_path)
+            return 200, data, meta.get("etag")
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = self.http_get(url, headers=headers)
+        except Exception as e:
+            if meta is None:
+                raise
+            return self._serve_stale(data_path, meta, data, str(e))
+
+        if response.status_code == 304 and meta is not None:
+            self.revalidated += 1
+            meta["validated_at"] = time.time()
+            try:
+                self._write_entry(data_path, meta_path, meta)
+            except OSError as e:
+                logging.log(logging.WARNING, f"[cache] Falha ao atualizar metadados do asset no cache em disco: {str(e)}")
+            self._touch(data_path)
+            return 200, data, meta.get("etag")
+
+        if response.status_code >= 500 and meta is not None:
+            return self._serve_stale(data_path, meta, data, f"status {response.status_code}")
+
+        if response.status_code != 200:
+            return response.status_code, None, None
+
+        self.misses += 1
+        content = response.content
+        meta = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "size": len(content),
+            "validated_at": time.time(),
+        }
+        try:
+            self._write_entry(data_path, meta_path, meta, content)
+            self._evict()
+        except OSError as e:
+            logging.log(logging.WARNING, f"[cache] Falha ao gravar asset no cache em disco: {str(e)}")
+        return 200, content, meta["etag"]
+
+    def _serve_stale(self, data_path, meta, data, reason):
+        logging.log(logging.WARNING, f"[cache] Origem indisponível ({reason}), servindo cópia vencida do cache em disco.")
+        self.stale += 1
+        self._touch(data_path)
+        return 200, data, meta.get("etag")
+
+    def stats(self):
+        return {
+            "dir": self.cache_dir,
+            "max_bytes": self.max_bytes,
+            "max_age": self.max_age,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale": self.stale,
+        }
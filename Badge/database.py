@@ -1,19 +1,452 @@
 import traceback
-from datetime import datetime, timedelta
-from pymongo import MongoClient
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import MongoClient, monitoring
+from pymongo.errors import BulkWriteError
 from pilmoji import Pilmoji
 import logging
 import urllib.parse
+import json
+import base64
+import hashlib
+from collections import namedtuple
 
 from . import azure
+from . import indexes
+from .bloom import ScalableBloomFilter
+
+# Parâmetros do pool de conexões (podem ser sobrescritos por variáveis de ambiente)
+MONGO_MAX_POOL_SIZE = int(os.getenv("BADGE_MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("BADGE_MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("BADGE_MONGO_MAX_IDLE_TIME_MS", "120000"))
+MONGO_HEARTBEAT_FREQUENCY_MS = int(os.getenv("BADGE_MONGO_HEARTBEAT_FREQUENCY_MS", "30000"))
+MONGO_HEALTH_CHECK_INTERVAL = int(os.getenv("BADGE_MONGO_HEALTH_CHECK_INTERVAL", "60"))
+
+# Filtro de Bloom dos badgeIds emitidos (cache negativo para GUIDs desconhecidos)
+BLOOM_ENABLED = os.getenv("BADGE_BLOOM_ENABLED", "1") == "1"
+BLOOM_INITIAL_CAPACITY = int(os.getenv("BADGE_BLOOM_INITIAL_CAPACITY", "100000"))
+BLOOM_ERROR_RATE = float(os.getenv("BADGE_BLOOM_ERROR_RATE", "0.001"))
+BLOOM_SYNC_INTERVAL = int(os.getenv("BADGE_BLOOM_SYNC_INTERVAL", "30"))
+BLOOM_SYNC_SKEW = int(os.getenv("BADGE_BLOOM_SYNC_SKEW", "120"))
+BLOOM_BATCH_SIZE = int(os.getenv("BADGE_BLOOM_BATCH_SIZE", "5000"))
+
+# Paginação por keyset (_id) das listagens
+PAGE_SIZE = int(os.getenv("BADGE_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("BADGE_MAX_PAGE_SIZE", "1000"))
+
+# Tamanho dos lotes do cursor nas listagens em streaming (NDJSON)
+STREAM_BATCH_SIZE = int(os.getenv("BADGE_STREAM_BATCH_SIZE", "500"))
+
+# Intervalo de recarga do conjunto de badges revogados usado na validação por token
+REVOCATION_SYNC_INTERVAL = int(os.getenv("BADGE_REVOCATION_SYNC_INTERVAL", "60"))
+
+# Registros leves devolvidos pelas leituras; cada consulta projeta apenas os campos que os preenchem
+BadgeValidation = namedtuple("BadgeValidation", [
+    "holder_name", "issuer_name", "badge_name", "badge_image_url", "badge_category", "emitido_em", "signature", "status"
+])
+BadgePostInfo = namedtuple("BadgePostInfo", ["badge_name", "additional_info"])
+BadgeSummary = namedtuple("BadgeSummary", ["badge_id", "name"])
+BadgeHolder = namedtuple("BadgeHolder", ["name", "email"])
+BadgePage = namedtuple("BadgePage", ["items", "continuation_token"])
+
+VALIDATION_PROJECTION = {
+    "_id": 0, "holder.name": 1, "issuer.name": 1, "name": 1, "category": 1, "revoked": 1,
+    "generatedBadge.badgeImageUrl": 1, "generatedBadge.metadata.issuedDate": 1, "generatedBadge.signature": 1
+}
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Contabiliza eventos do pool de conexões do MongoClient compartilhado."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failed = 0
+
+    def _incr(self, attr, delta=1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._incr("created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr("closed")
+
+    def connection_check_out_started(self, event):
+        self._incr("waiting")
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failed += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self._incr("checked_out", -1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "created": self.created,
+                "closed": self.closed,
+                "open": self.created - self.closed,
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "checkout_failed": self.checkout_failed,
+            }
+
+class MongoClientRegistry:
+    """
+    Registro de MongoClients compartilhados pelo processo, um por string de conexão.
+    Os clientes são criados sob demanda, recriados após fork e verificados periodicamente com 'ping'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self):
+        # Sockets herdados do processo pai não podem ser reutilizados no filho
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def _create_client(self, conn_str):
+        listener = PoolStatsListener()
+        client = MongoClient(
+            conn_str,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            heartbeatFrequencyMS=MONGO_HEARTBEAT_FREQUENCY_MS,
+            connect=False,
+            event_listeners=[listener]
+        )
+        return {"client": client, "listener": listener, "last_check": time.monotonic()}
+
+    def _is_healthy(self, entry):
+        if time.monotonic() - entry["last_check"] < MONGO_HEALTH_CHECK_INTERVAL:
+            return True
+        try:
+            entry["client"].admin.command("ping")
+            entry["last_check"] = time.monotonic()
+            return True
+        except Exception as e:
+            logging.log(logging.WARNING, f"[database] Health check do MongoClient falhou, recriando cliente: {e}")
+            return False
+
+    def get_client(self, conn_str):
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+
+        entry = self._clients.get(conn_str)
+        if entry is not None and self._is_healthy(entry):
+            return entry["client"]
+
+        with self._lock:
+            current = self._clients.get(conn_str)
+            if current is not None and current is not entry:
+                # Outra thread já criou (ou recriou) o cliente
+                return current["client"]
+            if current is not None:
+                current["client"].close()
+            logging.log(logging.INFO, f"[database] Criando MongoClient compartilhado.")
+            entry = self._create_client(conn_str)
+            self._clients[conn_str] = entry
+            return entry["client"]
+
+    def stats(self):
+        return [
+            {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "min_pool_size": MONGO_MIN_POOL_SIZE,
+                "max_idle_time_ms": MONGO_MAX_IDLE_TIME_MS,
+                **entry["listener"].snapshot()
+            }
+            for entry in list(self._clients.values())
+        ]
+
+    def discard(self, conn_str):
+        with self._lock:
+            entry = self._clients.pop(conn_str, None)
+        if entry is not None:
+            entry["client"].close()
+
+    def close_all(self):
+        with self._lock:
+            for entry in self._clients.values():
+                entry["client"].close()
+            self._clients = {}
+
+client_registry = MongoClientRegistry()
+
+def get_pool_stats():
+    return client_registry.stats()
+
+class BadgeIdFilter:
+    """
+    Filtro de Bloom escalável com os badgeIds já emitidos, para rejeitar em memória GUIDs certamente inexistentes.
+    É construído no primeiro uso a partir de um cursor projetado sobre a coleção e atualizado a cada inserção local.
+    Badges emitidos por outras instâncias são incorporados por sincronização incremental em segundo plano (_id gerado
+    após a última sincronização, com margem para diferença de relógio), no máximo uma vez a cada BLOOM_SYNC_INTERVAL.
+    Uma resposta negativa só é dada com o filtro sincronizado dentro desse intervalo; com o filtro defasado a decisão
+    fica com a consulta pelo índice único de badgeId. A sincronização depende de _id ObjectId: se a coleção tiver
+    documentos com outro tipo de _id, o filtro nunca rejeita. Qualquer falha também faz o filtro responder "talvez".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._synced_from = None
+        self._synced_at = 0
+        self._syncing = False
+        self._authoritative = False
+        self.checks = 0
+        self.rejections = 0
+        self.stale_checks = 0
+        self.builds = 0
+        self.syncs = 0
+        self.untracked_ids = 0
+        self.build_seconds = 0.0
+
+    def _load(self, bloom, collection, since=None):
+        query = {}
+        if since is not None:
+            query = {"_id": {"$gte": ObjectId.from_datetime(since - timedelta(seconds=BLOOM_SYNC_SKEW))}}
+        untracked = 0
+        cursor = collection.find(query, {"badgeId": 1, "_id": 1}).batch_size(BLOOM_BATCH_SIZE)
+        for badge in cursor:
+            if not isinstance(badge.get("_id"), ObjectId):
+                untracked += 1
+            badge_id = badge.get("badgeId")
+            if badge_id:
+                bloom.add(str(badge_id))
+        return untracked
+
+    def _is_stale(self):
+        return time.monotonic() - self._synced_at >= BLOOM_SYNC_INTERVAL
+
+    def _build(self, collection_loader):
+        with self._lock:
+            if self._bloom is not None:
+                return
+            synced_at = time.monotonic()
+            started_at = datetime.now(timezone.utc)
+            start = time.perf_counter()
+            bloom = ScalableBloomFilter(BLOOM_INITIAL_CAPACITY, BLOOM_ERROR_RATE)
+            self.untracked_ids = self._load(bloom, collection_loader())
+            self._authoritative = self.untracked_ids == 0
+            self._bloom = bloom
+            self._synced_from = started_at
+            self._synced_at = synced_at
+            self.builds += 1
+            self.build_seconds = time.perf_counter() - start
+            logging.log(logging.INFO, f"[database] Filtro de badgeIds construído com {len(bloom)} badges em {self.build_seconds:.2f}s.")
+            if not self._authoritative:
+                logging.log(logging.WARNING, f"[database] {self.untracked_ids} badges com _id que não é ObjectId; o filtro de badgeIds não rejeitará consultas.")
+
+    def _sync(self, collection_loader):
+        try:
+            synced_at = time.monotonic()
+            started_at = datetime.now(timezone.utc)
+            self._load(self._bloom, collection_loader(), since=self._synced_from)
+            with self._lock:
+                self._synced_from = started_at
+                self._synced_at = synced_at
+                self.syncs += 1
+        except Exception as e:
+            logging.log(logging.WARNING, f"[database] Falha ao sincronizar o filtro de badgeIds, mantendo o conteúdo atual: {e}")
+        finally:
+            self._syncing = False
+
+    def _schedule_sync(self, collection_loader):
+        with self._lock:
+            if self._syncing:
+                return
+            self._syncing = True
+        threading.Thread(target=self._sync, args=(collection_loader,), name="BadgeIdFilterSync", daemon=True).start()
+
+    def might_contain(self, badge_guid, collection_loader):
+        """False somente quando o GUID certamente não foi emitido."""
+        if not BLOOM_ENABLED:
+            return True
+        self.checks += 1
+        badge_guid = str(badge_guid)
+        try:
+            if self._bloom is None:
+                self._build(collection_loader)
+            elif self._is_stale():
+                self._schedule_sync(collection_loader)
+
+            if badge_guid in self._bloom or not self._authoritative:
+                return True
+            if self._is_stale():
+                # Badges de outras instâncias podem faltar no filtro: a consulta ao banco decide
+                self.stale_checks += 1
+                return True
+        except Exception as e:
+            logging.log(logging.WARNING, f"[database] Filtro de badgeIds indisponível, consultando o banco: {e}")
+            return True
+        self.rejections += 1
+        return False
+
+    def add(self, badge_guid):
+        # Antes da construção não há o que atualizar: a carga inicial incluirá o badge
+        if self._bloom is not None and badge_guid:
+            self._bloom.add(str(badge_guid))
+
+    def stats(self):
+        return {
+            "enabled": BLOOM_ENABLED,
+            "ready": self._bloom is not None,
+            "checks": self.checks,
+            "rejections": self.rejections,
+            "builds": self.builds,
+            "syncs": self.syncs,
+            "stale_checks": self.stale_checks,
+            "sync_interval": BLOOM_SYNC_INTERVAL,
+            "untracked_ids": self.untracked_ids,
+            "authoritative": self._authoritative,
+            "build_seconds": round(self.build_seconds, 3),
+            **(self._bloom.stats() if self._bloom is not None else {}),
+        }
+
+badge_id_filter = BadgeIdFilter()
+
+def get_bloom_stats():
+    return badge_id_filter.stats()
+
+class RevocationSet:
+    """
+    Conjunto em memória dos badgeIds revogados (documentos com revoked=true), recarregado a cada
+    REVOCATION_SYNC_INTERVAL segundos. Permite validar tokens assinados sem consultar o banco por leitura.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revoked = None
+        self._loaded_at = 0
+        self.loads = 0
+        self.load_failures = 0
+
+    def _refresh(self, collection_loader):
+        with self._lock:
+            if self._revoked is not None and time.monotonic() - self._loaded_at < REVOCATION_SYNC_INTERVAL:
+                return
+            cursor = collection_loader().find({"revoked": True}, {"badgeId": 1, "_id": 0})
+            self._revoked = frozenset(str(badge["badgeId"]) for badge in cursor if badge.get("badgeId"))
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+    def is_revoked(self, badge_guid, collection_loader):
+        """True/False conforme o conjunto carregado, ou None se ele não puder ser carregado."""
+        try:
+            self._refresh(collection_loader)
+        except Exception as e:
+            self.load_failures += 1
+            logging.log(logging.WARNING, f"[database] Falha ao carregar badges revogados: {e}")
+            return None
+        return str(badge_guid) in self._revoked
+
+    def stats(self):
+        return {
+            "loaded": self._revoked is not None,
+            "revoked": len(self._revoked) if self._revoked is not None else 0,
+            "loads": self.loads,
+            "load_failures": self.load_failures,
+        }
+
+revocation_set = RevocationSet()
+
+def get_revocation_stats():
+    return revocation_set.stats()
+
+class InvalidContinuationToken(ValueError):
+    pass
+
+def _token_scope(*values):
+    return hashlib.sha256("\0".join(str(value) for value in values).encode("utf-8")).hexdigest()[:12]
+
+def encode_continuation_token(last_id, scope):
+    payload = json.dumps({"a": str(last_id), "s": scope}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+def decode_continuation_token(token, scope):
+    """_id a partir do qual a próxima página começa; InvalidContinuationToken se o token for inválido ou de outra consulta."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if payload.get("s") != scope:
+            raise InvalidContinuationToken("Token de continuação pertence a outra consulta.")
+        return ObjectId(payload["a"])
+    except InvalidContinuationToken:
+        raise
+    except (ValueError, TypeError, KeyError, AttributeError, InvalidId) as e:
+        raise InvalidContinuationToken(f"Token de continuação inválido: {e}")
+
+def clamp_page_size(page_size):
+    try:
+        page_size = int(page_size) if page_size is not None else PAGE_SIZE
+    except (TypeError, ValueError):
+        page_size = PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+def _user_badges_query(user_id):
+    return {
+        "$or": [
+            {"holder.name": user_id},
+            {"holder.email": user_id}
+        ]
+    }
+
+def _find_page(collection, query, projection, page_size, continuation_token, scope):
+    """Executa a consulta ordenada por _id a partir do token e devolve (documentos, próximo token)."""
+    page_size = clamp_page_size(page_size)
+    if continuation_token:
+        query = {"$and": [query, {"_id": {"$gt": decode_continuation_token(continuation_token, scope)}}]}
+
+    # Um documento a mais indica se há próxima página
+    cursor = collection.find(query, {**projection, "_id": 1}).sort("_id", 1).limit(page_size + 1).batch_size(page_size + 1)
+    documents = list(cursor)
+    next_token = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        next_token = encode_continuation_token(documents[-1]["_id"], scope)
+    return documents, next_token
 
 class Database:
     def __init__(self):
-        # Configuração do cliente Azure
-        azure_client = azure.Azure()
+        # Cliente Azure compartilhado pelo processo
+        self.azure_client = azure.get_azure_client()
 
         logging.log(logging.INFO, f"[database] Obter dados de conexão com o banco.")
-        conn_str_orig = urllib.parse.unquote(azure_client.get_key_vault_secret('CosmosDBConnectionString'))
+        conn_str_orig = urllib.parse.unquote(self.azure_client.get_key_vault_secret('CosmosDBConnectionString'))
         self.conn_str = self._transform_connection_string(conn_str_orig)
 
     def _transform_connection_string(self, original_conn_str):
@@ -22,94 +455,162 @@ class Database:
                               
     def connect(self):
         try:
-            logging.log(logging.INFO, f"[database] Conectando com o banco.")
-            client = MongoClient(self.conn_str)
+            client = client_registry.get_client(self.conn_str)
+            indexes.ensure_indexes(client)
             return client
         except Exception as e:
+            self._handle_auth_error(e)
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro de conexão com o banco de dados: {e}\nStack Trace:\n{stack_trace}")
             raise
 
+    def _badges_collection(self):
+        return self.connect()['dbBadges']['Badges']
+
+    def _handle_auth_error(self, error):
+        # Credencial do CosmosDB possivelmente rotacionada: descarta o segredo em cache e o cliente associado
+        if azure.is_auth_error(error):
+            self.azure_client.invalidate_secret('CosmosDBConnectionString')
+            client_registry.discard(self.conn_str)
+
     def get_badge_template(self, issuer_name, area_name):
         try:
-            with self.connect() as client:
-                db = client['dbBadges']
-                templates_collection = db['Templates']
-
-                # Buscar o template baseado no nome do emissor e na área
-                template_data = templates_collection.find_one({
-                    "IssuerName": issuer_name,
-                    "AreaDetails.AreaName": area_name
-                })
-
-                # Verificar se o template foi encontrado
-                if template_data:
-                    # Preparar os dados do template para retornar
-                    template_info = {
-                        "BlobUrl": urllib.parse.unquote(template_data.get("BlobUrl")),
-                        "AreaDetails": template_data.get("AreaDetails", {}),
-                        "ContentDetails": template_data.get("ContentDetails", {})
-                    }
-                    return template_info
-                else:
-                    logging.log(logging.WARNING, f"Nenhum template encontrado para o emissor '{issuer_name}' na área '{area_name}'.")
-                    return None
+            client = self.connect()
+            db = client['dbBadges']
+            templates_collection = db['Templates']
+
+            # Buscar o template baseado no nome do emissor e na área
+            template_data = templates_collection.find_one({
+                "IssuerName": issuer_name,
+                "AreaDetails.AreaName": area_name
+            }, {"_id": 0, "BlobUrl": 1, "AreaDetails": 1, "ContentDetails": 1})
+
+            # Verificar se o template foi encontrado
+            if template_data:
+                # Preparar os dados do template para retornar
+                template_info = {
+                    "BlobUrl": urllib.parse.unquote(template_data.get("BlobUrl")),
+                    "AreaDetails": template_data.get("AreaDetails", {}),
+                    "ContentDetails": template_data.get("ContentDetails", {})
+                }
+                return template_info
+            else:
+                logging.log(logging.WARNING, f"Nenhum template encontrado para o emissor '{issuer_name}' na área '{area_name}'.")
+                return None
         except Exception as e:
+            self._handle_auth_error(e)
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro ao obter template do badge: {e}\nStack Trace:\n{stack_trace}")
             return None
         
+    def is_badge_revoked(self, badge_guid):
+        return revocation_set.is_revoked(badge_guid, self._badges_collection)
+
     def get_badge_image(self, badge_guid):
         try:
-            with self.connect() as client:
-                db = client['dbBadges']
-                badges_collection = db['Badges']
-                badge_document = badges_collection.find_one({"badgeId": badge_guid})
+            if not badge_id_filter.might_contain(badge_guid, self._badges_collection):
+                logging.log(logging.WARNING, f"Nenhum badge encontrado com GUID: {badge_guid}")
+                return None
+
+            client = self.connect()
+            db = client['dbBadges']
+            badges_collection = db['Badges']
+            badge_document = badges_collection.find_one({"badgeId": badge_guid}, {"_id": 0, "generatedBadge.badgeImageUrl": 1})
 
-                if badge_document:
-                    # Extrai a URL da imagem do badge
-                    badge_image_url = badge_document.get('generatedBadge', {}).get('badgeImageUrl', None)
-                    return badge_image_url
-                else:
-                    logging.log(logging.WARNING, f"Nenhum badge encontrado com GUID: {badge_guid}")
-                    return None
+            if badge_document:
+                # Extrai a URL da imagem do badge
+                badge_image_url = badge_document.get('generatedBadge', {}).get('badgeImageUrl', None)
+                return badge_image_url
+            else:
+                logging.log(logging.WARNING, f"Nenhum badge encontrado com GUID: {badge_guid}")
+                return None
 
         except Exception as e:
+            self._handle_auth_error(e)
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro ao obter imagem do badge: {e}\nStack Trace:\n{stack_trace}")
             return None
 
     def insert_badge(self, badge_guid, badge_data):
         try:
-            with self.connect() as client:
-                db = client['dbBadges']
-                badges_collection = db['Badges']
-                logging.log(logging.INFO, f"[database] Inserindo dados no banco.")
-                badges_collection.insert_one(badge_data)
+            client = self.connect()
+            db = client['dbBadges']
+            badges_collection = db['Badges']
+            logging.log(logging.INFO, f"[database] Inserindo dados no banco.")
+            badges_collection.insert_one(badge_data)
+            badge_id_filter.add(badge_guid)
             return True
         except Exception as e:
+            self._handle_auth_error(e)
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro ao inserir badge no banco de dados: {e}\nStack Trace:\n{stack_trace}")
             return False
 
     def insert_badge_json(self, badge_json):
         try:
-            with self.connect() as client:
-                db = client['dbBadges']
-                badges_collection = db['Badges'] 
+            client = self.connect()
+            db = client['dbBadges']
+            badges_collection = db['Badges'] 
 
-                # Insira o JSON diretamente na coleção
-                result = badges_collection.insert_one(badge_json)
+            # Insira o JSON diretamente na coleção
+            result = badges_collection.insert_one(badge_json)
+            badge_id_filter.add(badge_json.get("badgeId"))
 
-                if result.inserted_id:
-                    return str(result.inserted_id)
-                else:
-                    return result
+            if result.inserted_id:
+                return str(result.inserted_id)
+            else:
+                return result
         except Exception as e:
+            self._handle_auth_error(e)
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro ao inserir JSON da insígnia no banco de dados: {e}\nStack Trace:\n{stack_trace}")
             return None
 
+    def insert_badges_json(self, badges_json):
+        """
+        Insere os documentos em um único insert_many não ordenado. Retorna (ids, erros), ambos indexados pela
+        posição em badges_json, ou None se a operação falhar por completo.
+        """
+        try:
+            client = self.connect()
+            db = client['dbBadges']
+            badges_collection = db['Badges']
+
+            write_errors = {}
+            try:
+                badges_collection.insert_many(badges_json, ordered=False)
+            except BulkWriteError as e:
+                # Sem ordenação os demais documentos são gravados; apenas os listados falharam
+                for write_error in e.details.get("writeErrors", []):
+                    write_errors[write_error["index"]] = write_error.get("errmsg", "Erro de escrita")
+
+            # O driver atribui o _id de cada documento antes do envio
+            inserted_ids = {}
+            for index, badge_json in enumerate(badges_json):
+                if index not in write_errors:
+                    inserted_ids[index] = str(badge_json["_id"])
+                    badge_id_filter.add(badge_json.get("badgeId"))
+
+            return inserted_ids, write_errors
+        except Exception as e:
+            self._handle_auth_error(e)
+            stack_trace = traceback.format_exc()
+            logging.log(logging.ERROR, f"Erro ao inserir lote de badges no banco de dados: {e}\nStack Trace:\n{stack_trace}")
+            return None
+
+    def find_badge_document_ids(self, badge_ids):
+        """Mapa badgeId -> _id dos badges já gravados entre os informados, ou None se a consulta falhar."""
+        try:
+            badges = self._badges_collection().find({"badgeId": {"$in": list(badge_ids)}}, {"badgeId": 1, "_id": 1})
+            found = {badge["badgeId"]: str(badge["_id"]) for badge in badges}
+            for badge_id in found:
+                badge_id_filter.add(badge_id)
+            return found
+        except Exception as e:
+            self._handle_auth_error(e)
+            logging.log(logging.ERROR, f"Erro ao conferir badges gravados: {str(e)}")
+            return None
+
     def create_badge_json_v1(self, badge_id, name, description, issuer_id, issuer_name, issuer_email, issuer_phone, holder_id, holder_name, holder_email, category_main, category_sub, template_id, template_url, badge_image_url, issued_date, expiry_date, additional_info, verification_link):
         badge_json = {
             "badgeId": badge_id,
@@ -151,102 +652,149 @@ class Database:
 
     def validate_badge(self, badge_guid):
         try:
-            with self.connect() as client:
-                db = client['dbBadges']
-                badges_collection = db['Badges']
+            if not badge_id_filter.might_contain(badge_guid, self._badges_collection):
+                logging.log(logging.WARNING, f"Nenhum badge encontrado com GUID: {badge_guid}")
+                return None
+
+            client = self.connect()
+            db = client['dbBadges']
+            badges_collection = db['Badges']
                 
-                # Encontra o badge pelo GUID
-                badge = badges_collection.find_one({"badgeId": badge_guid})
-
-                # Verifica se o badge foi encontrado
-                if badge:
-                    # Retorna informações relevantes para validar a posse do badge
-                    holder_name = badge.get('holder', {}).get('name', 'Nome não disponível')
-                    issuer_name = badge.get('issuer', {}).get('name', 'Emissor não disponível')
-                    badge_name = badge.get('name', 'Badge não disponível')
-                    badge_image_url = badge.get('generatedBadge', {}).get('badgeImageUrl', 'URL da imagem não disponível')
-                    category = badge.get('category', {})
-                    badge_category = f"{category.get('mainCategory', 'Categoria não disponível')} - {category.get('subCategory', 'Subcategoria não disponível')}"
-                    emitido_em = badge.get('generatedBadge', {}).get('metadata', {}).get('issuedDate', 'Data não disponível')
-
-                    return {
-                        "holder_name": holder_name,
-                        "issuer_name": issuer_name,
-                        "badge_name": badge_name,
-                        "badge_image_url": badge_image_url,
-                        "badge_category": badge_category,
-                        "emitido_em": emitido_em,
-                        "status": "success"
-                    }
-                else:
-                    logging.log(logging.WARNING, f"Nenhum badge encontrado com GUID: {badge_guid}")
-                    return {"status": "error"}
+            # Encontra o badge pelo GUID
+            badge = badges_collection.find_one({"badgeId": badge_guid}, VALIDATION_PROJECTION)
+
+            # Verifica se o badge foi encontrado
+            if badge:
+                # Retorna informações relevantes para validar a posse do badge
+                category = badge.get('category', {})
+                generated_badge = badge.get('generatedBadge', {})
+                status = "success"
+                if badge.get('revoked'):
+                    logging.log(logging.WARNING, f"Badge revogado: {badge_guid}")
+                    status = "revoked"
+
+                return BadgeValidation(
+                    holder_name=badge.get('holder', {}).get('name', 'Nome não disponível'),
+                    issuer_name=badge.get('issuer', {}).get('name', 'Emissor não disponível'),
+                    badge_name=badge.get('name', 'Badge não disponível'),
+                    badge_image_url=generated_badge.get('badgeImageUrl', 'URL da imagem não disponível'),
+                    badge_category=f"{category.get('mainCategory', 'Categoria não disponível')} - {category.get('subCategory', 'Subcategoria não disponível')}",
+                    emitido_em=generated_badge.get('metadata', {}).get('issuedDate', 'Data não disponível'),
+                    signature=generated_badge.get('signature'),
+                    status=status
+                )
+            else:
+                logging.log(logging.WARNING, f"Nenhum badge encontrado com GUID: {badge_guid}")
+                return None
 
         except Exception as e:
+            self._handle_auth_error(e)
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro ao validar badge: {e}\nStack Trace:\n{stack_trace}")
             return None
 
-    def get_user_badges(self, user_id):
+    def get_user_badges(self, user_id, page_size=None, continuation_token=None):
         try:
-            with self.connect() as client:
-                db = client['dbBadges']
-                badges_collection = db['Badges']
-                
-                badges = badges_collection.find({
-                    "$or": [
-                        {"holder.name": user_id},
-                        {"holder.email": user_id}
-                    ]
-                })
-
-                return list(badges)
+            client = self.connect()
+            db = client['dbBadges']
+            badges_collection = db['Badges']
                 
+            badges, next_token = _find_page(
+                badges_collection,
+                _user_badges_query(user_id),
+                {"badgeId": 1, "name": 1},
+                page_size,
+                continuation_token,
+                _token_scope("user_badges", user_id)
+            )
+
+            return BadgePage([BadgeSummary(badge.get("badgeId", ""), badge.get("name", "")) for badge in badges], next_token)
+
+        except InvalidContinuationToken:
+            raise
         except Exception as e:
+            self._handle_auth_error(e)
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro ao obter badges do usuário: {e}\nStack Trace:\n{stack_trace}")
             return None
 
-    def get_badge_holders(self, badge_name):
+    def get_badge_holders(self, badge_name, page_size=None, continuation_token=None):
         try:
-            with self.connect() as client:
-                db = client['dbBadges']
-                badges_collection = db['Badges']
+            client = self.connect()
+            db = client['dbBadges']
+            badges_collection = db['Badges']
 
-                # Encontrar todos os registros associados ao nome do badge
-                badge_holders = badges_collection.find({"name": badge_name})
+            # Encontrar os registros associados ao nome do badge, uma página por vez
+            badge_holders, next_token = _find_page(
+                badges_collection,
+                {"name": badge_name},
+                {"holder.name": 1, "holder.email": 1},
+                page_size,
+                continuation_token,
+                _token_scope("badge_holders", badge_name)
+            )
 
-                # Criar uma lista com os detalhes dos detentores do badge
-                holders_list = []
-                for badge in badge_holders:
-                    holder_name = badge.get('holder', {}).get('name', 'Nome não disponível')
-                    holder_email = badge.get('holder', {}).get('email', 'E-mail não disponível')
-                    holders_list.append({"name": holder_name, "email": holder_email})
+            # Criar uma lista com os detalhes dos detentores do badge
+            holders_list = []
+            for badge in badge_holders:
+                holder_name = badge.get('holder', {}).get('name', 'Nome não disponível')
+                holder_email = badge.get('holder', {}).get('email', 'E-mail não disponível')
+                holders_list.append(BadgeHolder(holder_name, holder_email))
 
-                return holders_list
+            return BadgePage(holders_list, next_token)
 
+        except InvalidContinuationToken:
+            raise
         except Exception as e:
+            self._handle_auth_error(e)
             stack_trace = traceback.format_exc()
             logging.log(logging.ERROR, f"Erro ao obter detentores do badge: {str(e)}\nStack Trace:\n{stack_trace}")
             return None
 
+    def _iter_cursor(self, query, projection, error_message):
+        """Gera os documentos direto do cursor, em lotes de STREAM_BATCH_SIZE, fechando-o ao final ou na interrupção."""
+        try:
+            cursor = self._badges_collection().find(query, projection).sort("_id", 1).batch_size(STREAM_BATCH_SIZE)
+            try:
+                yield from cursor
+            finally:
+                cursor.close()
+        except Exception as e:
+            self._handle_auth_error(e)
+            stack_trace = traceback.format_exc()
+            logging.log(logging.ERROR, f"{error_message}: {e}\nStack Trace:\n{stack_trace}")
+            raise
+
+    def iter_user_badges(self, user_id):
+        badges = self._iter_cursor(_user_badges_query(user_id), {"badgeId": 1, "name": 1}, "Erro ao percorrer badges do usuário")
+        for badge in badges:
+            yield BadgeSummary(badge.get("badgeId", ""), badge.get("name", ""))
+
+    def iter_badge_holders(self, badge_name):
+        badges = self._iter_cursor({"name": badge_name}, {"holder.name": 1, "holder.email": 1}, "Erro ao percorrer detentores do badge")
+        for badge in badges:
+            holder = badge.get('holder', {})
+            yield BadgeHolder(holder.get('name', 'Nome não disponível'), holder.get('email', 'E-mail não disponível'))
+
     def get_badge_info_for_post(self, badge_guid):
         try:
-            with self.connect() as client:
-                db = client['dbBadges']
-                badges_collection = db['Badges']
+            client = self.connect()
+            db = client['dbBadges']
+            badges_collection = db['Badges']
 
-                # Encontra o badge pelo GUID
-                badge = badges_collection.find_one({"badgeId": badge_guid})
+            # Encontra o badge pelo GUID
+            badge = badges_collection.find_one({"badgeId": badge_guid}, {"_id": 0, "name": 1, "description": 1})
 
-                if badge:
-                    # Extrai as informações necessárias para a postagem
-                    badge_name = badge.get('name', 'Badge não disponível')
-                    additional_info = badge.get('description', 'Descrição não disponível')
-                    return badge_name, additional_info
-                else:
-                    return None
+            if badge:
+                # Extrai as informações necessárias para a postagem
+                return BadgePostInfo(
+                    badge_name=badge.get('name', 'Badge não disponível'),
+                    additional_info=badge.get('description', 'Descrição não disponível')
+                )
+            else:
+                return None
         except Exception as e:
+            self._handle_auth_error(e)
             logging.log(logging.ERROR, f"Erro ao obter informações do badge para postagem: {str(e)}")
             return None
 
@@ -3,21 +3,94 @@ import io
 import base64
 import uuid
 import hashlib
+import datetime
 import piexif
 import re
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
 import qrcode
+import numpy as np
 import requests
 import logging
+import os
+import json
+import threading
 from pilmoji import Pilmoji
+from pilmoji.source import BaseSource
 from string import Formatter
 
 from . import azure
-from pgpy import PGPKey, PGPMessage
+from . import merkle
+from .cache import LRUCache
+from .signer import PGPSigner
+from .tokens import ValidationTokenSigner, looks_like_token, read_badge_id
+
+# Cliente Azure compartilhado, inicializado sob demanda
+azure_client = azure.azure_client
+
+# Cache de fontes já carregadas, por (URL ou caminho da fonte, tamanho)
+FONT_CACHE_MAX_BYTES = int(os.getenv("BADGE_FONT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+font_cache = LRUCache("fonts", max_bytes=FONT_CACHE_MAX_BYTES)
+
+# Cache da camada estática do badge (template + área + ícone + emissor), por (emissor, área, versão do template)
+STATIC_LAYER_CACHE_MAX_BYTES = int(os.getenv("BADGE_STATIC_LAYER_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+STATIC_LAYER_CACHE_TTL = int(os.getenv("BADGE_STATIC_LAYER_CACHE_TTL", "3600"))
+static_layer_cache = LRUCache("static_layers", max_bytes=STATIC_LAYER_CACHE_MAX_BYTES, ttl=STATIC_LAYER_CACHE_TTL)
+
+# Os FreeTypeFont do cache são compartilhados entre threads (emissão em lote); o desenho de texto é serializado
+text_render_lock = threading.Lock()
+
+# Validadores JSON Schema já compilados, por (URL do schema, ETag)
+schema_validator_cache = LRUCache("schema_validators", max_entries=16)
+
+# Sprites de emoji locais (nomes no padrão Twemoji, ex.: 1f3c6.png) e cache das imagens de emoji já recortadas
+EMOJI_SPRITES_DIR = os.getenv("BADGE_EMOJI_SPRITES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "emoji"))
+EMOJI_REMOTE_URL = os.getenv("BADGE_EMOJI_REMOTE_URL", "https://cdn.jsdelivr.net/gh/twitter/twemoji@v14.0.2/assets/72x72/{codepoints}.png")
+EMOJI_OFFLINE = os.getenv("BADGE_EMOJI_OFFLINE", "false").lower() in ("1", "true", "yes")
+emoji_image_cache = LRUCache("emoji_images", max_entries=int(os.getenv("BADGE_EMOJI_CACHE_MAX_ENTRIES", "256")))
+
+class LocalEmojiSource(BaseSource):
+    """
+    Fonte de emojis do Pilmoji que lê os sprites de um diretório local.
+    Sprites ausentes são baixados uma única vez pelo cache de assets em disco, a menos que BADGE_EMOJI_OFFLINE esteja ativo;
+    se o download falhar o emoji não é desenhado, sem interromper a renderização. O install.ps1 popula o diretório.
+    """
+
+    def __init__(self, sprites_dir=EMOJI_SPRITES_DIR, remote_url=EMOJI_REMOTE_URL, offline=EMOJI_OFFLINE):
+        self.sprites_dir = sprites_dir
+        self.remote_url = remote_url
+        self.offline = offline
+
+    @staticmethod
+    def codepoints(emoji):
+        # Padrão Twemoji: codepoints em hexadecimal separados por '-', sem o seletor de variação FE0F
+        return "-".join(f"{ord(char):x}" for char in emoji if char != "\ufe0f")
+
+    def get_emoji(self, emoji, /):
+        codepoints = self.codepoints(emoji)
+        sprite_path = os.path.join(self.sprites_dir, f"{codepoints}.png")
+        if os.path.exists(sprite_path):
+            with open(sprite_path, "rb") as sprite_file:
+                return BytesIO(sprite_file.read())
+
+        if self.offline:
+            logging.log(logging.WARNING, f"Sprite do emoji '{codepoints}' não encontrado em {self.sprites_dir}.")
+            return None
 
-# Configuração do cliente Azure
-azure_client = azure.Azure()
+        try:
+            status_code, sprite_data = azure.asset_cache.fetch(self.remote_url.format(codepoints=codepoints))
+        except Exception as e:
+            logging.log(logging.WARNING, f"Falha ao baixar o sprite do emoji '{codepoints}': {str(e)}")
+            return None
+        if status_code != 200:
+            logging.log(logging.WARNING, f"Sprite do emoji '{codepoints}' indisponível. Código de resposta: {status_code}")
+            return None
+        return BytesIO(sprite_data)
+
+    def get_discord_emoji(self, id, /):
+        return None
+
+emoji_source = LocalEmojiSource()
 
 def gera_guid_badge():
     return str(uuid.uuid4())
@@ -54,46 +127,80 @@ def get_pgp_public_key():
     public_key = azure_client.get_key_vault_secret(public_key_name)
     return format_pgp_key(public_key, "pub")
 
+def get_pgp_passphrase():
+    return azure_client.get_key_vault_secret("PGPPassphrase")
+
+# Chaves PGP interpretadas e desbloqueadas uma única vez, compartilhadas por assinatura e (de)criptografia
+pgp_signer = PGPSigner(get_pgp_private_key, get_pgp_public_key, get_pgp_passphrase)
+
+def invalidate_pgp_secrets():
+    azure_client.invalidate_secret(azure_client.get_app_config_setting('PGPPrivateKeyName'))
+    azure_client.invalidate_secret("PGPPassphrase")
+    pgp_signer.invalidate()
+
 def sign_data(data):
-    private_key_str = get_pgp_private_key()
-    passphrase = azure_client.get_key_vault_secret("PGPPassphrase")
-
-    # Carregar a chave privada
-    privkey = PGPKey()
-    privkey.parse(private_key_str)
-
-    #privkey, _ = PGPKey.from_blob(private_key_str)
-
-    # Se a chave estiver protegida e a passphrase fornecida, tentar desbloquear
-    if privkey.is_protected and passphrase:
-        with privkey.unlock(passphrase):
-            if privkey.is_unlocked:
-                signature = privkey.sign(data)
-            else:
-                raise ValueError("Falha ao desbloquear a chave privada. Verifique a passphrase.")
-    else:
-        # Assinar o hash
-        signature = privkey.sign(data)
+    try:
+        return pgp_signer.sign(data)
+    except Exception:
+        # Chave ou passphrase possivelmente rotacionadas: força nova leitura no Key Vault
+        invalidate_pgp_secrets()
+        raise
+
+def verify_data(data, signature):
+    return pgp_signer.verify(data, signature)
+
+def build_single_signature_record(badge_hash, signed_hash):
+    return {"type": "single", "algorithm": "sha3-256", "badgeHash": badge_hash, "signature": signed_hash}
+
+def sign_badge_hashes(badge_hashes):
+    # Assina apenas a raiz da árvore de Merkle do lote; cada badge guarda a sua prova de inclusão
+    levels = merkle.build_tree(badge_hashes)
+    root = merkle.merkle_root(levels)
+    root_signature = sign_data(root)
+    return [
+        {
+            "type": "merkle",
+            "algorithm": "sha3-256",
+            "badgeHash": badge_hash,
+            "root": root,
+            "rootSignature": root_signature,
+            "proof": merkle.inclusion_proof(levels, index),
+            "batchSize": len(badge_hashes)
+        }
+        for index, badge_hash in enumerate(badge_hashes)
+    ]
+
+def verify_badge_signature(signature_record):
+    try:
+        if not signature_record:
+            return False
+        if signature_record.get("type") == "merkle":
+            if not merkle.verify_inclusion(signature_record["badgeHash"], signature_record["proof"], signature_record["root"]):
+                return False
+            return verify_data(signature_record["root"], signature_record["rootSignature"])
+        return verify_data(signature_record["badgeHash"], signature_record["signature"])
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        logging.log(logging.ERROR, f"Erro ao verificar assinatura do badge: {str(e)}\nStack Trace:\n{stack_trace}")
+        return False
+
+def get_token_signing_key():
+    token_key_name = azure_client.get_app_config_setting('BadgeTokenKeyName')
+    return azure_client.get_key_vault_secret(token_key_name)
 
-    return str(signature)
+# Chave Ed25519 dos tokens de validação do QR Code, carregada uma única vez
+validation_token_signer = ValidationTokenSigner(get_token_signing_key)
+
+def issue_validation_token(badge_guid, holder_name, issuer_name, area_name, issued_date):
+    return validation_token_signer.issue(badge_guid, holder_name, issuer_name, area_name, issued_date)
+
+def verify_validation_token(token):
+    if not looks_like_token(token):
+        return None
+    return validation_token_signer.verify(token)
 
 def decrypt_data(encrypted_data):
-    private_key_str = get_pgp_private_key()
-    passphrase = azure_client.get_key_vault_secret("PGPPassphrase")
-
-    # Carregar a chave privada
-    privkey = PGPKey()
-    privkey.parse(private_key_str)
-
-    # Se a chave estiver protegida e a passphrase fornecida, tentar desbloquear
-    if privkey.is_protected and passphrase:
-        with privkey.unlock(passphrase):
-            if privkey.is_unlocked:
-                decrypted_message = privkey.decrypt(encrypted_data)
-            else:
-                raise ValueError("Falha ao desbloquear a chave privada. Verifique a passphrase.")
-    else:
-        decrypted_message = privkey.decrypt(encrypted_data)
+    decrypted_message = pgp_signer.decrypt(encrypted_data)
 
     # Verificar se a descriptografia foi bem-sucedida
     if not decrypted_message:
@@ -103,21 +210,9 @@ def decrypt_data(encrypted_data):
 
 def encrypt_data(data):
     logging.log(logging.INFO, f"[helpers] Mensagem: {data}")
-    public_key_str = get_pgp_public_key()
-    logging.log(logging.INFO, f"[helpers] PGP Public Key: {public_key_str}")
-
-    # Carregar a chave pública
-    pubkey, _ = PGPKey.from_blob(public_key_str)
 
-    # Verificar se a chave carregada é uma chave pública
-    if not pubkey.is_public:
-        raise ValueError("A chave fornecida não é uma chave pública válida.")
-
-    # Criar uma nova mensagem PGP a partir dos dados
-    message = PGPMessage.new(data)
-
-    # Criptografar a mensagem com a chave pública
-    encrypted_phrase = pubkey.encrypt(message)
+    # Criptografar a mensagem com a chave pública em cache
+    encrypted_phrase = pgp_signer.encrypt(data)
     logging.log(logging.INFO, f"[helpers] Mensagem criptografada: {encrypted_phrase}")
 
     return encrypted_phrase
@@ -156,15 +251,12 @@ def convert_image_to_jpg(input_image):
             logging.log(logging.INFO, f"Convertendo {input_image.format} para JPG com fundo branco")
             width, height = input_image.size
             white_background_image = Image.new('RGB', (width, height), 'white')
-            white_background_image.paste(input_image.convert('RGBA'), (0, 0), input_image.convert('RGBA'))
-
-            # Salva a imagem em um buffer em memória no formato JPG
-            buffer = io.BytesIO()
-            white_background_image.save(buffer, 'JPEG')
-            buffer.seek(0)
+            rgba_image = input_image.convert('RGBA')
+            white_background_image.paste(rgba_image, (0, 0), rgba_image)
 
+            # A imagem segue em memória (RGB); a codificação JPEG acontece uma única vez, na emissão
             logging.log(logging.INFO, "Convertido para JPG com fundo branco")
-            return Image.open(buffer)  # Retorna o objeto da imagem em memória
+            return white_background_image
         else:
             # Se já for JPG, não precisa de conversão
             logging.log(logging.ERROR, "A imagem já está em formato JPG")
@@ -173,42 +265,69 @@ def convert_image_to_jpg(input_image):
         logging.log(logging.ERROR, f"Erro ao converter a imagem para JPG com fundo branco: {str(e)}")
         return None
 
-def generate_image_with_emoji(emoji_string, font_data, font_size=70, background_color=(255, 255, 255), text_color=(0, 0, 0)):
-    try:
-        # Estimativa inicial do tamanho da imagem
-        estimated_size = (font_size, font_size) 
+def get_cached_font(font_url, size):
+    def loader():
+        font_data = azure_client.return_blob_as_binary(font_url)
+        if font_data is None:
+            raise IOError(f"Não foi possível baixar a fonte: {font_url}")
+        # A FreeTypeFont mantém os bytes do arquivo em memória enquanto estiver em uso
+        font_size_bytes = font_data.getbuffer().nbytes
+        return ImageFont.truetype(font_data, size), font_size_bytes
+
+    return font_cache.get_or_load((font_url, size), loader)
+
+def render_emoji_image(emoji_string, font, font_size, background_color, text_color):
+    # Estimativa inicial do tamanho da imagem
+    estimated_size = (font_size, font_size) 
 
-        image = Image.new('RGB', estimated_size, background_color)
-        font = ImageFont.truetype(font_data, font_size)
+    image = Image.new('RGB', estimated_size, background_color)
 
-        with Pilmoji(image) as pilmoji:
-            # Renderiza o emoji
-            pilmoji.text((0, 0), emoji_string.strip(), text_color, font)
+    with Pilmoji(image, source=emoji_source) as pilmoji:
+        # Renderiza o emoji
+        pilmoji.text((0, 0), emoji_string.strip(), text_color, font)
 
-            # Encontrar a área ocupada pelo emoji
-            bbox = image.getbbox()
-            if bbox:
-                # Cortar a imagem para o tamanho do conteúdo
-                image = image.crop(bbox)
+        # Encontrar a área ocupada pelo emoji
+        bbox = image.getbbox()
+        if bbox:
+            # Cortar a imagem para o tamanho do conteúdo
+            image = image.crop(bbox)
 
-        return image  # Retorna a imagem cortada para o tamanho do emoji
+    return image
+
+def generate_image_with_emoji(emoji_string, font, font_size=70, background_color=(255, 255, 255), text_color=(0, 0, 0)):
+    try:
+        if not isinstance(font, ImageFont.FreeTypeFont):
+            font = ImageFont.truetype(font, font_size)
+
+        def loader():
+            image = render_emoji_image(emoji_string, font, font_size, background_color, text_color)
+            return image, 1
+
+        cache_key = (emoji_string.strip(), font.getname(), font_size, tuple(background_color), tuple(text_color))
+        image = emoji_image_cache.get_or_load(cache_key, loader)
+
+        return image.copy()  # Retorna a imagem cortada para o tamanho do emoji
     except Exception as e:
         logging.log(logging.ERROR, f"Erro ao gerar imagem com emoji: {str(e)}")
         return None
 
 def add_text_to_badge(badge_template, text_data_json):
+    with text_render_lock:
+        return _add_text_to_badge(badge_template, text_data_json)
+
+def _add_text_to_badge(badge_template, text_data_json):
     try:
         draw = ImageDraw.Draw(badge_template)
 
         for text_item in text_data_json:
             content = text_item.get("content", "")
             position = text_item.get("position", (0, 0))
-            font_data = azure_client.return_blob_as_binary(text_item.get("font", ""))
+            font_url = text_item.get("font", "")
             font_size = text_item.get("size", 20)
             color = tuple(text_item.get("color", (0, 0, 0)))
 
             if any(ord(char) > 256 for char in content):  # Tratar como emoji
-                emoji_image = generate_image_with_emoji(content, font_data, font_size)
+                emoji_image = generate_image_with_emoji(content, get_cached_font(font_url, font_size), font_size)
                 if position[0] == "center":
                     image_width = badge_template.size[0]
                     x = (image_width - emoji_image.size[0]) / 2
@@ -223,7 +342,7 @@ def add_text_to_badge(badge_template, text_data_json):
                 
             else:  # Tratar como texto normal
                 try:
-                    font = ImageFont.truetype(font_data, font_size)
+                    font = get_cached_font(font_url, font_size)
                     text_bbox = draw.textbbox((0, 0), content, font=font)
                     text_width = text_bbox[2] - text_bbox[0]
                     if position[0] == "center":
@@ -244,58 +363,141 @@ def add_text_to_badge(badge_template, text_data_json):
         logging.log(logging.ERROR, f"Erro ao adicionar texto ao badge: {str(e)}\nStack Trace:\n{stack_trace}")
         return None
 
-def create_qr_code(data, base_url, box_size=3, border=1):
-    if not data or not base_url:
-        logging.log(logging.ERROR, "Dados ou URL base não fornecidos para o QR Code.")
+def get_template_version(badge_template_info, static_text_data_json):
+    # Qualquer alteração no documento do template ou na formatação dos textos estáticos gera nova versão
+    payload = json.dumps({"template": badge_template_info, "text": static_text_data_json}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def render_static_badge_layer(badge_template_info, static_text_data_json):
+    badge_template = azure_client.return_blob_as_image(badge_template_info.get('BlobUrl'))
+    if not badge_template:
+        logging.log(logging.ERROR, "Falha ao carregar template de badge.")
+        return None
+
+    badge_template = convert_image_to_jpg(badge_template)
+    if badge_template is None:
         return None
 
+    return add_text_to_badge(badge_template, static_text_data_json)
+
+def get_static_badge_layer(issuer_name, area_name, badge_template_info, static_text_data_json):
+    # Devolve a instância em cache, compartilhada entre requisições: quem for desenhar deve trabalhar sobre uma cópia
     try:
-        # Criar a instância QR Code
-        qr = qrcode.QRCode(version=1, box_size=box_size, border=border)
+        template_version = get_template_version(badge_template_info, static_text_data_json)
+
+        def loader():
+            layer = render_static_badge_layer(badge_template_info, static_text_data_json)
+            if layer is None:
+                raise ValueError(f"Falha ao renderizar a camada estática do badge para '{issuer_name}'/'{area_name}'.")
+            layer.load()
+            return layer, layer.width * layer.height * len(layer.getbands())
 
-        # Adicionar dados ao QR Code
-        qr.add_data(f"{base_url}?data={data}")
-        qr.make(fit=True)
+        return static_layer_cache.get_or_load((issuer_name, area_name, template_version), loader)
 
-        # Gerar a imagem QR Code
-        qr_code_img = qr.make_image(fill='black', back_color='white')
-        return qr_code_img
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        logging.log(logging.ERROR, f"Erro ao obter camada estática do badge: {str(e)}\nStack Trace:\n{stack_trace}")
+        return None
+
+def qr_code_matrix(content, border=1):
+    # Calcula a matriz de módulos (já com a borda) uma única vez; a rasterização é feita com NumPy
+    qr = qrcode.QRCode(version=1, border=border)
+    qr.add_data(content)
+    qr.make(fit=True)
+    return np.array(qr.get_matrix(), dtype=bool)
+
+def render_qr_matrices(matrices, box_size, fill_color=(0, 0, 0), back_color=(255, 255, 255)):
+    # Converte as matrizes (de mesmo tamanho) para RGB de uma vez na resolução de módulos;
+    # a ampliação para box_size pixels por módulo é feita pelo redimensionamento NEAREST do Pillow
+    palette = np.array([back_color, fill_color], dtype=np.uint8)
+    pixels = palette[np.stack(matrices).view(np.uint8)]
+    height, width = pixels.shape[1:3]
+    target_size = (width * box_size, height * box_size)
+    return [Image.fromarray(qr_pixels).resize(target_size, Image.NEAREST) for qr_pixels in pixels]
+
+def fit_box_size(modules, box_size, max_width=None):
+    # Reduz os pixels por módulo para o QR Code (já com a borda) caber na largura do badge; colar_qr_code não o redimensiona
+    if max_width is None:
+        return box_size
+    return max(1, min(box_size, max_width // modules))
+
+def create_qr_code(data, base_url, box_size=3, border=1, max_width=None):
+    if not data or not base_url:
+        logging.log(logging.ERROR, "Dados ou URL base não fornecidos para o QR Code.")
+        return None
+
+    try:
+        matrix = qr_code_matrix(f"{base_url}?data={data}", border=border)
+        return render_qr_matrices([matrix], fit_box_size(matrix.shape[1], box_size, max_width))[0]
 
     except Exception as e:
         stack_trace = traceback.format_exc()
         logging.log(logging.ERROR, f"Erro ao criar QR Code: {str(e)}\nStack Trace:\n{stack_trace}")
         return None
 
-def process_badge_image(badge_template, issuer_name):
+def create_qr_codes(data_list, base_url, box_size=3, border=1, max_width=None):
+    """Gera os QR Codes de vários badges em uma chamada (emissão em lote), na mesma ordem de data_list."""
+    if not data_list or not base_url:
+        logging.log(logging.ERROR, "Dados ou URL base não fornecidos para os QR Codes.")
+        return None
+
     try:
-        # Adicionar dados EXIF à imagem
-        badge_with_exif = insert_exif(badge_template, issuer_name)
+        matrices = [qr_code_matrix(f"{base_url}?data={data}", border=border) for data in data_list]
+
+        # Agrupa por tamanho de matriz (versão do QR Code) para rasterizar cada grupo de uma vez
+        groups = {}
+        for index, matrix in enumerate(matrices):
+            groups.setdefault(matrix.shape, []).append(index)
+
+        qr_code_imgs = [None] * len(matrices)
+        for shape, indexes in groups.items():
+            group_box_size = fit_box_size(shape[1], box_size, max_width)
+            for index, qr_code_img in zip(indexes, render_qr_matrices([matrices[i] for i in indexes], group_box_size)):
+                qr_code_imgs[index] = qr_code_img
+        return qr_code_imgs
 
-        # Verificar se a imagem foi retornada corretamente
-        if badge_with_exif is None:
-            logging.log(logging.ERROR, "Falha ao inserir dados EXIF na imagem.")
-            return None, None, None
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        logging.log(logging.ERROR, f"Erro ao criar QR Codes: {str(e)}\nStack Trace:\n{stack_trace}")
+        return None
+
+def encode_badge_image(image, issuer_name):
+    # Única codificação do badge: JPEG com os dados EXIF do emissor
+    exif_dict = {"0th": {piexif.ImageIFD.Make: issuer_name.encode()}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
+    exif_bytes = piexif.dump(exif_dict)
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif_bytes)
+    return buffer.getvalue()
+
+def process_badge_image(badge_template, issuer_name, sign=True):
+    try:
+        if not isinstance(badge_template, Image.Image):
+            logging.log(logging.ERROR, "O objeto fornecido não é uma imagem válida.")
+            return None
 
-        # Salvar a imagem em um buffer de bytes
-        badge_bytes_io = io.BytesIO()
-        badge_with_exif.save(badge_bytes_io, format='PNG')
+        # Codificar a imagem uma única vez (JPEG + EXIF); hash, base64 e upload usam os mesmos bytes
+        badge_bytes = encode_badge_image(badge_template, issuer_name)
 
-        # Gerar hash da imagem e converter para base64
-        badge_hash = generate_image_hash(badge_with_exif)
-        badge_base64 = base64.b64encode(badge_bytes_io.getvalue()).decode('utf-8')
+        badge_hash = hashlib.sha3_256(badge_bytes).hexdigest()
+        badge_base64 = base64.b64encode(badge_bytes).decode('utf-8')
 
-        signed_hash = sign_data(badge_hash)
+        # Na emissão em lote a assinatura é feita depois, sobre a raiz de Merkle (sign_badge_hashes)
+        signed_hash = sign_data(badge_hash) if sign else None
 
-        return badge_hash, badge_base64, signed_hash, badge_with_exif
+        return badge_hash, badge_base64, signed_hash, badge_bytes
 
     except Exception as e:
         logging.log(logging.ERROR, f"Erro ao processar a imagem do badge: {e}")
-        return None, None, None
+        return None
 
 def load_font_from_google_fonts(css_url, size):
     try:
         # Baixar o CSS da fonte
-        response = requests.get(css_url)
+        response = azure.http_client.get(css_url)
         response.raise_for_status()
 
         # Extrair a URL da fonte do CSS
@@ -306,7 +508,7 @@ def load_font_from_google_fonts(css_url, size):
         font_url = font_url_match.group(1)
 
         # Baixar o arquivo da fonte
-        font_response = requests.get(font_url)
+        font_response = azure.http_client.get(font_url)
         font_response.raise_for_status()
 
         # Carregar a fonte
@@ -322,9 +524,11 @@ def load_font_from_google_fonts(css_url, size):
 
 def load_font(font_path, size):
     try:
-        # Carregar a fonte
-        font = ImageFont.truetype(font_path, size)
-        return font
+        # Carregar a fonte (reaproveitando a instância em cache)
+        def loader():
+            return ImageFont.truetype(font_path, size), os.path.getsize(font_path)
+
+        return font_cache.get_or_load((font_path, size), loader)
     except IOError:
         stack_trace = traceback.format_exc()
         # Erro específico para problemas relacionados à I/O, como arquivo de fonte não encontrado
@@ -335,61 +539,6 @@ def load_font(font_path, size):
         logging.log(logging.ERROR, f"Erro ao carregar a fonte ({font_path}): {str(e)}\nStack Trace:\n{stack_trace}")
     return None
 
-def generate_image_hash(image):
-    try:
-        # Validar os dados de entrada
-        if not isinstance(image, Image.Image):
-            logging.log(logging.ERROR, "O objeto fornecido não é uma imagem válida.")
-            return None
-
-        # Geração do hash da imagem usando SHA-3
-        img_hash = hashlib.sha3_256()
-        img_hash.update(image.tobytes())
-        return img_hash.hexdigest()
-
-    except Exception as e:
-        stack_trace = traceback.format_exc()
-        logging.log(logging.ERROR, f"Erro ao gerar o hash da imagem: {str(e)}\nStack Trace:\n{stack_trace}")
-        return None
-
-def insert_exif(image, issuer_name):
-    try:
-        # Validação dos dados de entrada
-        if not isinstance(image, Image.Image):
-            logging.log(logging.ERROR, "O objeto fornecido não é uma imagem válida.")
-            return None
-
-        exif_data = {"0th": {piexif.ImageIFD.Make: issuer_name.encode()}}
-        if not isinstance(exif_data, dict):
-            logging.log(logging.ERROR, "Os dados EXIF fornecidos não estão no formato de dicionário.")
-            return None
-
-        # Preparar os dados EXIF para inserção
-        exif_dict = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
-        for key, value in exif_data.items():
-            exif_dict[key] = value
-
-        exif_bytes = piexif.dump(exif_dict)
-
-        # Salvar a imagem em um buffer de memória com os dados EXIF
-        img_byte_arr = io.BytesIO()
-        if image.format == 'PNG':
-            image.save(img_byte_arr, format='PNG')
-        else:
-            if image.mode == 'RGBA':
-                image = image.convert('RGB')
-            image.save(img_byte_arr, format='JPEG', exif=exif_bytes)
-
-        img_byte_arr.seek(0)
-
-        # Reabrir a imagem do buffer de memória
-        return Image.open(img_byte_arr)
-
-    except Exception as e:
-        stack_trace = traceback.format_exc()
-        logging.log(logging.ERROR, f"Erro ao inserir dados EXIF na imagem: {e}\nStack Trace:\n{stack_trace}")
-        return None
-
 def validar_url_https(url):
     pattern = r'^https:\/\/[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}(\/[^\s]*)?$'
     return re.match(pattern, url) is not None
@@ -443,19 +592,54 @@ def png_to_jpeg(png_image, background_color=(255, 255, 255)):
         logging.log(logging.ERROR, f"Erro ao converter a imagem: {e}")
         return None
 
+def compile_json_schema(json_schema):
+    import jsonschema
+
+    if isinstance(json_schema, (str, bytes)):
+        json_schema = json.loads(json_schema)
+
+    # Verifica o schema uma única vez e cria o validador da versão declarada em $schema, com verificação de formatos
+    validator_class = jsonschema.validators.validator_for(json_schema)
+    validator_class.check_schema(json_schema)
+
+    # As datas do documento são datetime (gravadas como data no CosmosDB) e valem como "string" no schema
+    type_checker = validator_class.TYPE_CHECKER.redefine(
+        "string", lambda checker, instance: isinstance(instance, (str, datetime.datetime))
+    )
+    validator_class = jsonschema.validators.extend(validator_class, type_checker=type_checker)
+    return validator_class(json_schema, format_checker=jsonschema.FormatChecker())
+
+def get_schema_validator(schema_url):
+    try:
+        schema_text, etag = azure_client.return_blob_as_text_with_etag(schema_url)
+        if schema_text is None:
+            logging.log(logging.WARNING, f"Schema JSON não encontrado: {schema_url}")
+            return None
+
+        version = etag or hashlib.sha256(schema_text.encode("utf-8")).hexdigest()
+        cache_key = (azure.asset_cache.cache_key(schema_url), version)
+        return schema_validator_cache.get_or_load(cache_key, lambda: (compile_json_schema(schema_text), 1))
+
+    except Exception as e:
+        stack_trace = traceback.format_exc()
+        logging.log(logging.WARNING, f"Erro ao compilar o schema JSON: {str(e)}\nStack Trace:\n{stack_trace}")
+        return None
+
 def validate_data_into_json_schema(json_schema, data):
     try:
         import jsonschema
 
-        # Valide os dados em relação ao esquema para garantir que estejam em conformidade
-        jsonschema.validate(instance=data, schema=json_schema)
-
-    except jsonschema.ValidationError as ve:
-        # Detalhes do erro de validação
-        error_message = f"Erro de validação do esquema JSON: {ve.message}"
-        error_path = " -> ".join([str(path) for path in ve.path])
-        logging.log(logging.WARNING, f"{error_message}\nLocalização do erro: {error_path}")
-        return False
+        # Aceita um validador já compilado (get_schema_validator) ou o schema em si
+        validator = json_schema if hasattr(json_schema, "iter_errors") else compile_json_schema(json_schema)
+
+        # Valide os dados em relação ao esquema para garantir que estejam em conformidade (uma única passada)
+        errors = list(validator.iter_errors(data))
+        if errors:
+            for error in errors:
+                error_message = f"Erro de validação do esquema JSON: {error.message}"
+                error_path = " -> ".join([str(path) for path in error.path])
+                logging.log(logging.WARNING, f"{error_message}\nLocalização do erro: {error_path}")
+            return False
 
     except jsonschema.SchemaError as se:
         # Erro no esquema em si (por exemplo, esquema malformado)
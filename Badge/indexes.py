@@ -0,0 +1,151 @@
+"""
+Especificação declarativa dos índices das coleções do dbBadges e verificação dos planos de consulta.
+
+Uso (a partir da raiz do repositório, com acesso ao Key Vault/App Configuration):
+    python -m Badge.indexes            # cria os índices que faltam
+    python -m Badge.indexes --check    # cria os índices e falha se alguma consulta fizer collection scan
+"""
+import os
+import sys
+import json
+import logging
+import threading
+
+DATABASE_NAME = "dbBadges"
+
+# Índices por coleção; a ordem das chaves segue a forma das consultas em database.py
+INDEX_SPEC = {
+    "Badges": [
+        # find_one({"badgeId": ...}) em validação, imagem e postagem
+        {"name": "ux_badgeId", "keys": [("badgeId", 1)], "unique": True},
+        # get_user_badges: cada ramo do $or usa o seu próprio índice
+        {"name": "ix_holder_name", "keys": [("holder.name", 1), ("_id", 1)]},
+        {"name": "ix_holder_email", "keys": [("holder.email", 1), ("_id", 1)]},
+        # get_badge_holders: filtro por nome do badge, paginado por _id
+        {"name": "ix_name_id", "keys": [("name", 1), ("_id", 1)]},
+        # Conjunto de revogações dos tokens de validação
+        {"name": "ix_revoked", "keys": [("revoked", 1)]},
+    ],
+    "Templates": [
+        # get_badge_template
+        {"name": "ix_issuer_area", "keys": [("IssuerName", 1), ("AreaDetails.AreaName", 1)]},
+    ],
+}
+
+# Formas de consulta representativas, verificadas com explain()
+QUERY_SHAPES = [
+    {"name": "badge_by_id", "collection": "Badges", "filter": {"badgeId": "00000000-0000-0000-0000-000000000000"}},
+    {"name": "user_badges", "collection": "Badges", "filter": {"$or": [{"holder.name": "-"}, {"holder.email": "-"}]}},
+    {"name": "badge_holders", "collection": "Badges", "filter": {"name": "-"}},
+    {"name": "revoked_badges", "collection": "Badges", "filter": {"revoked": True}},
+    {"name": "badge_template", "collection": "Templates", "filter": {"IssuerName": "-", "AreaDetails.AreaName": "-"}},
+]
+
+# Quando ativo, os índices são aplicados na primeira conexão de cada processo
+ENSURE_INDEXES_ON_STARTUP = os.getenv("BADGE_ENSURE_INDEXES", "0") == "1"
+
+_ensure_lock = threading.Lock()
+_ensured = False
+
+def apply_indexes(db, spec=INDEX_SPEC):
+    """Cria os índices ausentes e devolve o resultado por índice; índices já existentes com as mesmas chaves são mantidos."""
+    report = []
+    for collection_name, indexes in spec.items():
+        collection = db[collection_name]
+        existing = {tuple(info["key"]): (name, info) for name, info in collection.index_information().items()}
+
+        for index in indexes:
+            keys = [(field, direction) for field, direction in index["keys"]]
+            unique = index.get("unique", False)
+            result = {"collection": collection_name, "name": index["name"], "keys": keys}
+
+            current = existing.get(tuple(keys))
+            if current is not None:
+                current_name, info = current
+                if bool(info.get("unique", False)) != unique:
+                    result["status"] = "conflict"
+                    result["detail"] = f"Índice '{current_name}' com as mesmas chaves e unique={info.get('unique', False)}"
+                else:
+                    result["status"] = "exists"
+                report.append(result)
+                continue
+
+            try:
+                collection.create_index(keys, name=index["name"], unique=unique)
+                result["status"] = "created"
+            except Exception as e:
+                # No CosmosDB índices únicos só podem ser criados com a coleção vazia
+                result["status"] = "failed"
+                result["detail"] = str(e)
+            report.append(result)
+
+    for result in report:
+        level = logging.WARNING if result["status"] in ("conflict", "failed") else logging.INFO
+        logging.log(level, f"[indexes] {result['collection']}.{result['name']}: {result['status']} {result.get('detail', '')}".rstrip())
+    return report
+
+def _plan_stages(plan):
+    """Percorre o plano retornado pelo explain() e coleta todos os estágios."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+def check_query_plans(db, shapes=QUERY_SHAPES):
+    """Executa explain() para cada forma de consulta e sinaliza as que fazem collection scan."""
+    report = []
+    for shape in shapes:
+        result = {"name": shape["name"], "collection": shape["collection"]}
+        try:
+            explain = db[shape["collection"]].find(shape["filter"]).explain()
+            winning_plan = explain.get("queryPlanner", {}).get("winningPlan", explain)
+            stages = _plan_stages(winning_plan)
+            result["stages"] = stages
+            result["collection_scan"] = "COLLSCAN" in stages
+        except Exception as e:
+            result["error"] = str(e)
+            result["collection_scan"] = None
+
+        if result["collection_scan"]:
+            logging.log(logging.WARNING, f"[indexes] Consulta '{shape['name']}' em {shape['collection']} faz collection scan.")
+        report.append(result)
+    return report
+
+def ensure_indexes(client):
+    """Aplica a especificação uma única vez por processo (BADGE_ENSURE_INDEXES=1); falhas apenas são registradas."""
+    global _ensured
+    if not ENSURE_INDEXES_ON_STARTUP or _ensured:
+        return
+    with _ensure_lock:
+        if _ensured:
+            return
+        try:
+            apply_indexes(client[DATABASE_NAME])
+        except Exception as e:
+            logging.log(logging.WARNING, f"[indexes] Falha ao aplicar índices na inicialização: {e}")
+        _ensured = True
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from .database import Database
+
+    db = Database().connect()[DATABASE_NAME]
+    output = {"indexes": apply_indexes(db)}
+    if "--check" in argv:
+        output["query_plans"] = check_query_plans(db)
+    print(json.dumps(output, indent=2, ensure_ascii=False))
+
+    failed = any(result["status"] in ("conflict", "failed") for result in output["indexes"])
+    scans = any(result.get("collection_scan") for result in output.get("query_plans", []))
+    return 1 if failed or scans else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
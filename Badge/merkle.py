@@ -0,0 +1,54 @@
+import hashlib
+
+# Prefixos de domínio distintos para folhas e nós internos evitam colisões entre os dois níveis (RFC 6962)
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+def _sha3(data):
+    return hashlib.sha3_256(data).digest()
+
+def leaf_hash(badge_hash):
+    return _sha3(LEAF_PREFIX + bytes.fromhex(badge_hash))
+
+def node_hash(left, right):
+    return _sha3(NODE_PREFIX + left + right)
+
+def build_tree(badge_hashes):
+    """Retorna os níveis da árvore, das folhas até a raiz. Um nó sem par é promovido ao nível seguinte."""
+    if not badge_hashes:
+        raise ValueError("Nenhum hash informado para a árvore de Merkle.")
+
+    levels = [[leaf_hash(badge_hash) for badge_hash in badge_hashes]]
+    while len(levels[-1]) > 1:
+        current = levels[-1]
+        next_level = [node_hash(current[i], current[i + 1]) for i in range(0, len(current) - 1, 2)]
+        if len(current) % 2:
+            next_level.append(current[-1])
+        levels.append(next_level)
+    return levels
+
+def merkle_root(levels):
+    return levels[-1][0].hex()
+
+def inclusion_proof(levels, index):
+    """Lista de irmãos (posição e hash) necessários para recalcular a raiz a partir da folha de índice informado."""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"position": "left" if sibling < index else "right", "hash": level[sibling].hex()})
+        index //= 2
+    return proof
+
+def verify_inclusion(badge_hash, proof, root):
+    try:
+        current = leaf_hash(badge_hash)
+        for step in proof:
+            sibling = bytes.fromhex(step["hash"])
+            if step["position"] == "left":
+                current = node_hash(sibling, current)
+            else:
+                current = node_hash(current, sibling)
+        return current.hex() == root
+    except (KeyError, TypeError, ValueError):
+        return False
@@ -0,0 +1,156 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from contextlib import ExitStack
+from pgpy import PGPKey, PGPMessage, PGPSignature
+
+# Intervalo para reconferir no Key Vault (via cache de segredos) se a chave foi rotacionada
+PGP_KEY_CHECK_INTERVAL = int(os.getenv("BADGE_PGP_KEY_CHECK_INTERVAL", "60"))
+
+class OperationStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed, error=False):
+        self.count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        if error:
+            self.errors += 1
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_time / self.count * 1000, 2) if self.count else 0,
+            "max_ms": round(self.max_time * 1000, 2),
+        }
+
+class PGPSigner:
+    """
+    Mantém as chaves PGP já interpretadas em memória (a privada desbloqueada) e serializa o uso entre threads.
+    As chaves são recarregadas quando o conteúdo armazenado no Key Vault muda (rotação) ou após invalidate().
+    """
+
+    def __init__(self, private_key_loader, public_key_loader, passphrase_loader, check_interval=PGP_KEY_CHECK_INTERVAL):
+        self.private_key_loader = private_key_loader
+        self.public_key_loader = public_key_loader
+        self.passphrase_loader = passphrase_loader
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._private_key = None
+        self._private_digest = None
+        self._private_checked_at = 0
+        self._unlock_stack = ExitStack()
+        self._public_key = None
+        self._public_digest = None
+        self._public_checked_at = 0
+        self.reloads = 0
+        self._stats = {name: OperationStats() for name in ("sign", "verify", "encrypt", "decrypt")}
+
+    @staticmethod
+    def _digest(*values):
+        return hashlib.sha256("\0".join(value or "" for value in values).encode("utf-8")).hexdigest()
+
+    def _ensure_private_key(self):
+        if self._private_key is not None and time.monotonic() - self._private_checked_at < self.check_interval:
+            return self._private_key
+
+        private_key_str = self.private_key_loader()
+        passphrase = self.passphrase_loader()
+        digest = self._digest(private_key_str, passphrase)
+        if digest != self._private_digest:
+            logging.log(logging.INFO, "[signer] Carregando e desbloqueando a chave privada PGP.")
+            privkey = PGPKey()
+            privkey.parse(private_key_str)
+
+            unlock_stack = ExitStack()
+            # Se a chave estiver protegida e a passphrase fornecida, mantém a chave desbloqueada enquanto estiver em uso
+            if privkey.is_protected and passphrase:
+                unlock_stack.enter_context(privkey.unlock(passphrase))
+                if not privkey.is_unlocked:
+                    unlock_stack.close()
+                    raise ValueError("Falha ao desbloquear a chave privada. Verifique a passphrase.")
+
+            self._unlock_stack.close()
+            self._unlock_stack = unlock_stack
+            self._private_key = privkey
+            self._private_digest = digest
+            self.reloads += 1
+
+        self._private_checked_at = time.monotonic()
+        return self._private_key
+
+    def _ensure_public_key(self):
+        if self._public_key is not None and time.monotonic() - self._public_checked_at < self.check_interval:
+            return self._public_key
+
+        public_key_str = self.public_key_loader()
+        digest = self._digest(public_key_str)
+        if digest != self._public_digest:
+            logging.log(logging.INFO, "[signer] Carregando a chave pública PGP.")
+            pubkey, _ = PGPKey.from_blob(public_key_str)
+            if not pubkey.is_public:
+                raise ValueError("A chave fornecida não é uma chave pública válida.")
+            self._public_key = pubkey
+            self._public_digest = digest
+            self.reloads += 1
+
+        self._public_checked_at = time.monotonic()
+        return self._public_key
+
+    def _timed(self, operation, function):
+        start = time.perf_counter()
+        try:
+            result = function()
+        except Exception:
+            self._stats[operation].record(time.perf_counter() - start, error=True)
+            raise
+        self._stats[operation].record(time.perf_counter() - start)
+        return result
+
+    def sign(self, data):
+        with self._lock:
+            privkey = self._ensure_private_key()
+            return str(self._timed("sign", lambda: privkey.sign(data)))
+
+    def verify(self, data, signature):
+        if isinstance(signature, str):
+            signature = PGPSignature.from_blob(signature)
+        with self._lock:
+            pubkey = self._ensure_public_key()
+            return bool(self._timed("verify", lambda: pubkey.verify(data, signature)))
+
+    def encrypt(self, data):
+        with self._lock:
+            pubkey = self._ensure_public_key()
+            return self._timed("encrypt", lambda: pubkey.encrypt(PGPMessage.new(data)))
+
+    def decrypt(self, encrypted_data):
+        if isinstance(encrypted_data, str):
+            encrypted_data = PGPMessage.from_blob(encrypted_data)
+        with self._lock:
+            privkey = self._ensure_private_key()
+            return self._timed("decrypt", lambda: privkey.decrypt(encrypted_data))
+
+    def invalidate(self):
+        with self._lock:
+            self._unlock_stack.close()
+            self._private_key = None
+            self._private_digest = None
+            self._public_key = None
+            self._public_digest = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "private_key_loaded": self._private_key is not None,
+                "public_key_loaded": self._public_key is not None,
+                "reloads": self.reloads,
+                **{name: stats.snapshot() for name, stats in self._stats.items()},
+            }
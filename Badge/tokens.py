@@ -0,0 +1,125 @@
+import os
+import time
+import json
+import base64
+import hashlib
+import logging
+import threading
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from .signer import OperationStats
+
+# Intervalo para reconferir no Key Vault (via cache de segredos) se a chave de tokens foi rotacionada
+TOKEN_KEY_CHECK_INTERVAL = int(os.getenv("BADGE_TOKEN_KEY_CHECK_INTERVAL", "60"))
+
+TOKEN_VERSION = 1
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def looks_like_token(value):
+    return isinstance(value, str) and value.count(".") == 1
+
+def read_badge_id(token):
+    """GUID do badge contido no token, sem verificar a assinatura (uso restrito à consulta no banco)."""
+    try:
+        return json.loads(_b64decode(token.split(".")[0])).get("b")
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+class ValidationTokenSigner:
+    """
+    Emite e verifica tokens de validação compactos (payload JSON + assinatura Ed25519, ambos em base64url)
+    embutidos no QR Code. A chave privada vem do Key Vault como semente de 32 bytes em base64; a chave pública
+    derivada fica em memória. O campo "k" identifica a chave para detectar tokens emitidos antes de uma rotação.
+    """
+
+    def __init__(self, key_loader, check_interval=TOKEN_KEY_CHECK_INTERVAL):
+        self.key_loader = key_loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._private_key = None
+        self._public_key = None
+        self._key_id = None
+        self._digest = None
+        self._checked_at = 0
+        self.reloads = 0
+        self._stats = {name: OperationStats() for name in ("issue", "verify")}
+
+    def _ensure_keys(self, force=False):
+        with self._lock:
+            if self._private_key is not None and not force and time.monotonic() - self._checked_at < self.check_interval:
+                return self._private_key, self._public_key, self._key_id
+
+            seed = self.key_loader()
+            digest = hashlib.sha256(seed.encode("utf-8")).hexdigest()
+            if digest != self._digest:
+                logging.log(logging.INFO, "[tokens] Carregando a chave de assinatura dos tokens de validação.")
+                private_key = Ed25519PrivateKey.from_private_bytes(base64.b64decode(seed))
+                public_key = private_key.public_key()
+                public_bytes = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+                self._private_key = private_key
+                self._public_key = public_key
+                self._key_id = hashlib.sha256(public_bytes).hexdigest()[:8]
+                self._digest = digest
+                self.reloads += 1
+
+            self._checked_at = time.monotonic()
+            return self._private_key, self._public_key, self._key_id
+
+    def issue(self, badge_guid, holder_name, issuer_name, area_name, issued_date):
+        start = time.perf_counter()
+        private_key, _, key_id = self._ensure_keys()
+        claims = {
+            "v": TOKEN_VERSION,
+            "k": key_id,
+            "b": badge_guid,
+            "h": holder_name,
+            "i": issuer_name,
+            "a": area_name,
+            "d": int(issued_date.timestamp()),
+        }
+        payload = json.dumps(claims, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        token = f"{_b64encode(payload)}.{_b64encode(private_key.sign(payload))}"
+        self._stats["issue"].record(time.perf_counter() - start)
+        return token
+
+    def verify(self, token):
+        """Retorna as claims de um token autêntico ou None (token malformado, adulterado ou de chave desconhecida)."""
+        start = time.perf_counter()
+        try:
+            payload_b64, signature_b64 = token.split(".")
+            payload = _b64decode(payload_b64)
+            signature = _b64decode(signature_b64)
+            claims = json.loads(payload)
+            if claims.get("v") != TOKEN_VERSION:
+                raise ValueError("Versão de token não suportada.")
+
+            _, public_key, key_id = self._ensure_keys()
+            if claims.get("k") != key_id:
+                # Possível rotação ainda não percebida: relê a chave uma vez antes de recusar
+                _, public_key, key_id = self._ensure_keys(force=True)
+                if claims.get("k") != key_id:
+                    raise ValueError("Token assinado por chave desconhecida.")
+
+            public_key.verify(signature, payload)
+        except (InvalidSignature, ValueError, TypeError, AttributeError) as e:
+            logging.log(logging.WARNING, f"[tokens] Token de validação recusado: {type(e).__name__} {str(e)}")
+            self._stats["verify"].record(time.perf_counter() - start, error=True)
+            return None
+
+        self._stats["verify"].record(time.perf_counter() - start)
+        return claims
+
+    def stats(self):
+        return {
+            "key_loaded": self._public_key is not None,
+            "key_id": self._key_id,
+            "reloads": self.reloads,
+            **{name: stats.snapshot() for name, stats in self._stats.items()},
+        }
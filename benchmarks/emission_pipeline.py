@@ -0,0 +1,103 @@
+"""
+Benchmark do pipeline de codificação do badge: pipeline legado (JPEG -> EXIF -> PNG -> JPEG)
+versus codificação única (helpers.encode_badge_image). A assinatura PGP é excluída da medição.
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/emission_pipeline.py [iterações]
+"""
+import io
+import os
+import sys
+import time
+import base64
+import hashlib
+
+import piexif
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Badge import helpers
+
+class EncodeCounter:
+    """Conta chamadas a Image.save e Image.open durante a execução."""
+
+    def __enter__(self):
+        self.saves = 0
+        self.opens = 0
+        self._save = Image.Image.save
+        self._open = Image.open
+        counter = self
+
+        def save(image, *args, **kwargs):
+            counter.saves += 1
+            return counter._save(image, *args, **kwargs)
+
+        def open_(*args, **kwargs):
+            counter.opens += 1
+            return counter._open(*args, **kwargs)
+
+        Image.Image.save = save
+        Image.open = open_
+        return self
+
+    def __exit__(self, *exc):
+        Image.Image.save = self._save
+        Image.open = self._open
+
+def make_badge():
+    template = Image.new('RGBA', (600, 600), (240, 240, 255, 255))
+    draw = ImageDraw.Draw(template)
+    draw.ellipse((50, 50, 550, 550), fill=(30, 90, 200, 255))
+    draw.text((200, 280), "Detentor: Fulano de Tal", fill=(255, 255, 255, 255))
+    return template
+
+def legacy_pipeline(template, issuer_name):
+    # convert_image_to_jpg
+    background = Image.new('RGB', template.size, 'white')
+    background.paste(template.convert('RGBA'), (0, 0), template.convert('RGBA'))
+    buffer = io.BytesIO()
+    background.save(buffer, 'JPEG')
+    buffer.seek(0)
+    badge = Image.open(buffer)
+
+    # insert_exif
+    exif_bytes = piexif.dump({"0th": {piexif.ImageIFD.Make: issuer_name.encode()}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None})
+    exif_buffer = io.BytesIO()
+    badge.save(exif_buffer, format='JPEG', exif=exif_bytes)
+    exif_buffer.seek(0)
+    badge = Image.open(exif_buffer)
+
+    # process_badge_image
+    png_buffer = io.BytesIO()
+    badge.save(png_buffer, format='PNG')
+    badge_hash = hashlib.sha3_256(badge.tobytes()).hexdigest()
+    badge_base64 = base64.b64encode(png_buffer.getvalue()).decode('utf-8')
+
+    # Azure.upload_blob_image
+    upload_buffer = io.BytesIO()
+    badge.save(upload_buffer, format='JPEG')
+    return badge_hash, badge_base64, upload_buffer.getvalue()
+
+def single_encode_pipeline(template, issuer_name):
+    badge = helpers.convert_image_to_jpg(template)
+    badge_bytes = helpers.encode_badge_image(badge, issuer_name)
+    badge_hash = hashlib.sha3_256(badge_bytes).hexdigest()
+    badge_base64 = base64.b64encode(badge_bytes).decode('utf-8')
+    return badge_hash, badge_base64, badge_bytes
+
+def run(name, pipeline, iterations):
+    template = make_badge()
+    with EncodeCounter() as counter:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            pipeline(template, "Sinqia")
+        elapsed = time.perf_counter() - start
+    print(f"{name:<16} encodes/badge={counter.saves / iterations:.1f} "
+          f"decodes/badge={counter.opens / iterations:.1f} "
+          f"latência média={elapsed / iterations * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    run("legado", legacy_pipeline, iterations)
+    run("codificação única", single_encode_pipeline, iterations)
@@ -0,0 +1,50 @@
+"""
+Micro-benchmark da validação do JSON do badge contra badge_data.schema.json:
+jsonschema.validate a cada chamada (comportamento anterior) versus validador compilado em cache
+(helpers.compile_json_schema + helpers.validate_data_into_json_schema).
+
+Uso (a partir da raiz do repositório):
+    python benchmarks/schema_validation.py [iterações]
+"""
+import os
+import sys
+import time
+import logging
+import datetime
+
+import jsonschema
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from Badge import business, helpers
+
+logging.disable(logging.WARNING)
+
+# Documento montado pelo mesmo código da emissão, com issuedDate como datetime
+BADGE_JSON = business.build_badge_json(
+    "4f1c2d3e-0000-4000-8000-000000000000",
+    "Fulano de Tal",
+    "Sinqia",
+    "Agility",
+    "https://example.blob.core.windows.net/badges/4f1c2d3e.jpg",
+    datetime.datetime(2024, 1, 1),
+    helpers.build_single_signature_record("0" * 64, "assinatura"),
+)
+
+def run(name, function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<22} {iterations / elapsed:>10.0f} validações/s  ({elapsed / iterations * 1e6:.1f} µs/validação)")
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with open(os.path.join(ROOT_DIR, "badge_data.schema.json"), "r") as schema_file:
+        schema_text = schema_file.read()
+
+    validator = helpers.compile_json_schema(schema_text)
+
+    run("schema a cada chamada", lambda: helpers.validate_data_into_json_schema(schema_text, BADGE_JSON), iterations)
+    run("validador em cache", lambda: helpers.validate_data_into_json_schema(validator, BADGE_JSON), iterations)
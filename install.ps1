@@ -35,6 +35,7 @@ $nosqlDBName="nosql-badges-$randomIdentifier"
 $databaseName="dbBadges"
 $azappconfigName="appconfig-badges-$randomIdentifier"
 $keyVaultName = "kv-badges-$randomIdentifier"
+$BadgeTokenKeyName="BadgeTokenSigningKey"
 
 Write-Host "Criando grupo de recursos: $resourceGroupName" -ForegroundColor Green
 az group create --name $resourceGroupName --location "$location" --tags Environment=$environmentTag Product=$productTag CriadoEm=$criadoem
@@ -145,7 +146,8 @@ $newSettings = @(
     @{name='BadgeContainerName'; value=$BadgeContainerName},
     @{name='BadgeDBSchemaURL'; value=[System.Web.HttpUtility]::UrlEncode($BadgeDBSchemaURL)},
     @{name='BadgeVerificationUrl'; value=$BadgeVerificationUrl},
-    @{name='LinkedInPost'; value=$LinkedInPost}
+    @{name='LinkedInPost'; value=$LinkedInPost},
+    @{name='BadgeTokenKeyName'; value=$BadgeTokenKeyName}
 )
 
 foreach ($setting in $newSettings) {
@@ -157,6 +159,10 @@ $contentBadgeHeaderInfo = $contentBadgeHeaderInfo | ConvertTo-Json -Compress
 $contentBadgeHeaderInfo = $contentBadgeHeaderInfo -replace '"', '\"'
 az appconfig kv set --name $azappconfigName --key BadgeHeaderInfo --value "$contentBadgeHeaderInfo" --content-type "application/json;charset=utf-8" --label $labelValue
 
+Write-Host "Atualizando a chave sentinela do App Config $azappconfigName" -ForegroundColor Green
+# A Function só recarrega as configurações do label quando a sentinela muda: rode este passo após qualquer alteração
+az appconfig kv set --name $azappconfigName --key Sentinel --value (Get-Date -Format "yyyyMMddHHmmss") --content-type "text/plain;charset=utf-8" --label $labelValue --yes
+
 Write-Host "Setando segredos no Key Vault $keyVaultName" -ForegroundColor Green
 $nosqlConnectionStrinURLEncoded=[System.Web.HttpUtility]::UrlEncode($nosqlConnectionString)
 
@@ -169,6 +175,15 @@ $keyVaultSecretParameters | ForEach-Object {
     az keyvault secret set --vault-name $keyVaultName --name $_.SecretName --value $_.SecretValue --content-type $_.ContentType
 }
 
+# Semente Ed25519 (32 bytes em base64) dos tokens de validação do QR Code; só é gerada se ainda não existir,
+# pois trocá-la invalida os tokens já emitidos
+$tokenKeyExists = az keyvault secret list --vault-name $keyVaultName --query "[?name=='$BadgeTokenKeyName'] | length(@)" -o tsv
+if ($tokenKeyExists -eq "0") {
+    Write-Host "Gerando a chave de assinatura dos tokens de validação $BadgeTokenKeyName" -ForegroundColor Green
+    $badgeTokenSeed = [Convert]::ToBase64String([System.Security.Cryptography.RandomNumberGenerator]::GetBytes(32))
+    az keyvault secret set --vault-name $keyVaultName --name $BadgeTokenKeyName --value $badgeTokenSeed --content-type "text/plain; charset=utf-8"
+}
+
 Write-Host "Criando Collections Badges e Template detro do $nosqlDBName.$databaseName" -ForegroundColor Green
 $collectionsParameters = @(
     @{CollectionName="Template"},
@@ -181,5 +196,27 @@ $collectionsParameters | ForEach-Object {
 
 Write-Host "Para inserir os dados mínimos no CosmosDB $nosqlDBName.$databaseName pegue o conteúdo do arquivo .\template.json e insira no banco. OBRIGATORIAMENTE na collection de nome Template. Sem esse valor inicial a function não funcionará corretamente." -ForegroundColor Magenta
 
+Write-Host "Baixando os sprites dos emojis usados no template para .\Badge\emoji" -ForegroundColor Green
+# Os sprites vão junto com a Function, evitando que instâncias novas dependam da CDN para renderizar o badge
+$twemojiVersion = "14.0.2"
+$emojiSpritesDir = ".\Badge\emoji"
+New-Item -ItemType Directory -Force -Path $emojiSpritesDir | Out-Null
+$template = Get-Content -Path ".\template.json" -Raw | ConvertFrom-Json
+@($template.ContentDetails.Content, $template.AreaDetails.AreaName) | ForEach-Object {
+    $textElements = [System.Globalization.StringInfo]::GetTextElementEnumerator($_)
+    while ($textElements.MoveNext()) {
+        $element = $textElements.GetTextElement()
+        if ([char]::ConvertToUtf32($element, 0) -lt 0x2190) { continue }
+        $codepoints = @()
+        for ($i = 0; $i -lt $element.Length; $i++) {
+            $codepoint = [char]::ConvertToUtf32($element, $i)
+            if ($codepoint -gt 0xFFFF) { $i++ }
+            if ($codepoint -ne 0xFE0F) { $codepoints += "{0:x}" -f $codepoint }
+        }
+        $spriteName = ($codepoints -join "-") + ".png"
+        Invoke-WebRequest -Uri "https://cdn.jsdelivr.net/gh/twitter/twemoji@v$twemojiVersion/assets/72x72/$spriteName" -OutFile (Join-Path $emojiSpritesDir $spriteName)
+    }
+}
+
 Write-Host "Publicando function $functionAppName" -ForegroundColor Green
 func azure functionapp publish $functionAppName
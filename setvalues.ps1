@@ -4,6 +4,8 @@ $functionAppName="func-badges-$randomIdentifier"
 $storageAccountName = "blobbadges$randomIdentifier"
 $azappconfigName="appconfig-badges-$randomIdentifier"
 $keyVaultName = "kv-badges-$randomIdentifier"
+$labelValue="Badge"
+$BadgeTokenKeyName="BadgeTokenSigningKey"
 
 $BadgeContainerName="badges"
 $FontsContainerName="fonts"
@@ -73,7 +75,8 @@ $newSettings = @(
     @{name='BadgeContainerName'; value=$BadgeContainerName},
     @{name='BadgeDBSchemaURL'; value=[System.Web.HttpUtility]::UrlEncode($BadgeDBSchemaURL)},
     @{name='BadgeVerificationUrl'; value=$BadgeVerificationUrl},
-    @{name='LinkedInPost'; value=$LinkedInPost}
+    @{name='LinkedInPost'; value=$LinkedInPost},
+    @{name='BadgeTokenKeyName'; value=$BadgeTokenKeyName}
 )
 
 foreach ($setting in $newSettings) {
@@ -85,6 +88,10 @@ $contentBadgeHeaderInfo = $contentBadgeHeaderInfo | ConvertTo-Json -Compress
 $contentBadgeHeaderInfo = $contentBadgeHeaderInfo -replace '"', '\"'
 az appconfig kv set --name $azappconfigName --key BadgeHeaderInfo --value "$contentBadgeHeaderInfo" --content-type "application/json;charset=utf-8" --label $labelValue
 
+Write-Host "Atualizando a chave sentinela do App Config $azappconfigName" -ForegroundColor Green
+# A Function só recarrega as configurações do label quando a sentinela muda: rode este passo após qualquer alteração
+az appconfig kv set --name $azappconfigName --key Sentinel --value (Get-Date -Format "yyyyMMddHHmmss") --content-type "text/plain;charset=utf-8" --label $labelValue --yes
+
 Write-Host "Setando segredos no Key Vault $keyVaultName" -ForegroundColor Green
 $nosqlConnectionStrinURLEncoded=[System.Web.HttpUtility]::UrlEncode($nosqlConnectionString)
 
@@ -96,3 +103,12 @@ $keyVaultSecretParameters = @(
 $keyVaultSecretParameters | ForEach-Object {
     az keyvault secret set --vault-name $keyVaultName --name $_.SecretName --value $_.SecretValue --content-type $_.ContentType
 }
+
+# Semente Ed25519 (32 bytes em base64) dos tokens de validação do QR Code; só é gerada se ainda não existir,
+# pois trocá-la invalida os tokens já emitidos
+$tokenKeyExists = az keyvault secret list --vault-name $keyVaultName --query "[?name=='$BadgeTokenKeyName'] | length(@)" -o tsv
+if ($tokenKeyExists -eq "0") {
+    Write-Host "Gerando a chave de assinatura dos tokens de validação $BadgeTokenKeyName" -ForegroundColor Green
+    $badgeTokenSeed = [Convert]::ToBase64String([System.Security.Cryptography.RandomNumberGenerator]::GetBytes(32))
+    az keyvault secret set --vault-name $keyVaultName --name $BadgeTokenKeyName --value $badgeTokenSeed --content-type "text/plain; charset=utf-8"
+}